@@ -1,3 +1,7 @@
+-- STORAGE SETTINGS
+
+PRAGMA auto_vacuum = INCREMENTAL;
+
 -- DOMAIN TABLES
 
 CREATE TABLE books (
@@ -5,7 +9,8 @@ CREATE TABLE books (
     title TEXT NOT NULL,
     author TEXT NOT NULL,
     price REAL NOT NULL,
-    stock INTEGER NOT NULL
+    stock INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE customers (
@@ -29,6 +34,19 @@ CREATE TABLE order_items (
     FOREIGN KEY (isbn) REFERENCES books(isbn)
 );
 
+CREATE TABLE reservations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    isbn TEXT NOT NULL,
+    qty INTEGER NOT NULL,
+    session_id TEXT,
+    status TEXT NOT NULL DEFAULT 'held',
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (isbn) REFERENCES books(isbn)
+);
+
+CREATE INDEX idx_reservations_status_expires ON reservations (status, expires_at);
+
 -- CHAT STORAGE
 
 CREATE TABLE messages (
@@ -47,3 +65,9 @@ CREATE TABLE tool_calls (
     result_json TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+CREATE TABLE session_branches (
+    session_id TEXT PRIMARY KEY,
+    branch_id TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
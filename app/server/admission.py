@@ -0,0 +1,210 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Any, Optional
+
+from config import (
+    CHAT_MAX_CONCURRENCY,
+    CHAT_MAX_QUEUE_SIZE,
+    CHAT_QUEUE_SLO_SECONDS,
+    CHAT_RATE_LIMIT_PER_SECOND,
+    CHAT_RATE_LIMIT_BURST,
+    CHAT_INITIAL_SERVICE_SECONDS
+)
+
+
+SERVICE_TIME_SMOOTHING = 0.2
+WAIT_SAMPLE_LIMIT = 1000
+MAX_TRACKED_BUCKETS = 10000
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, status_code: int, retry_after_seconds: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after_seconds = max(1, math.ceil(retry_after_seconds))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed <= 0:
+            return
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_second)
+        self.updated_at = now
+
+    def try_acquire(self, now: float) -> float:
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate_per_second
+
+
+class _Ticket:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int = CHAT_MAX_CONCURRENCY,
+        max_queue_size: int = CHAT_MAX_QUEUE_SIZE,
+        queue_slo_seconds: float = CHAT_QUEUE_SLO_SECONDS,
+        rate_per_second: float = CHAT_RATE_LIMIT_PER_SECOND,
+        burst: float = CHAT_RATE_LIMIT_BURST,
+        initial_service_seconds: float = CHAT_INITIAL_SERVICE_SECONDS
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.queue_slo_seconds = queue_slo_seconds
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+
+        self._condition = threading.Condition()
+        self._active = 0
+        self._queued = 0
+        self._session_queues: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._service_seconds = initial_service_seconds
+        self._wait_samples: Deque[float] = deque(maxlen=WAIT_SAMPLE_LIMIT)
+        self._admitted = 0
+        self._rate_limited = 0
+        self._shed = 0
+
+    def _estimate_wait_seconds(self) -> float:
+        if self._active < self.max_concurrency and not self._queued:
+            return 0.0
+        return (self._queued + 1) * self._service_seconds / self.max_concurrency
+
+    def _check_rate_limit(self, session_id: str, now: float) -> None:
+        bucket = self._buckets.get(session_id)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_BUCKETS:
+                self._buckets.popitem(last=False)
+            bucket = TokenBucket(self.rate_per_second, self.burst)
+            self._buckets[session_id] = bucket
+        else:
+            self._buckets.move_to_end(session_id)
+
+        retry_after = bucket.try_acquire(now)
+        if retry_after:
+            self._rate_limited += 1
+            raise AdmissionRejected(
+                f"Rate limit exceeded for session {session_id}",
+                429,
+                retry_after
+            )
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrency and self._session_queues:
+            session_id, session_queue = self._session_queues.popitem(last=False)
+            ticket = session_queue.popleft()
+            if session_queue:
+                self._session_queues[session_id] = session_queue
+            self._queued -= 1
+            self._active += 1
+            ticket.granted = True
+        self._condition.notify_all()
+
+    def _abandon(self, ticket: _Ticket) -> None:
+        session_queue = self._session_queues.get(ticket.session_id)
+        if session_queue and ticket in session_queue:
+            session_queue.remove(ticket)
+            self._queued -= 1
+            if not session_queue:
+                del self._session_queues[ticket.session_id]
+
+    def _acquire(self, session_id: str) -> None:
+        with self._condition:
+            estimated_wait = self._estimate_wait_seconds()
+            if self._queued >= self.max_queue_size or estimated_wait > self.queue_slo_seconds:
+                self._shed += 1
+                raise AdmissionRejected(
+                    "Server is overloaded, please retry later",
+                    503,
+                    estimated_wait or self._service_seconds
+                )
+
+            self._check_rate_limit(session_id, time.monotonic())
+
+            ticket = _Ticket(session_id)
+            self._session_queues.setdefault(session_id, deque()).append(ticket)
+            self._queued += 1
+            self._dispatch()
+
+            deadline = ticket.enqueued_at + self.queue_slo_seconds
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._abandon(ticket)
+                    self._shed += 1
+                    raise AdmissionRejected(
+                        "Request waited too long in queue",
+                        503,
+                        self._estimate_wait_seconds()
+                    )
+                self._condition.wait(remaining)
+
+            self._admitted += 1
+            self._wait_samples.append(time.monotonic() - ticket.enqueued_at)
+
+    def _release(self, service_seconds: float) -> None:
+        with self._condition:
+            self._active -= 1
+            self._service_seconds += SERVICE_TIME_SMOOTHING * (service_seconds - self._service_seconds)
+            self._dispatch()
+
+    @contextmanager
+    def admit(self, session_id: str) -> Iterator[None]:
+        self._acquire(session_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._condition:
+            waits_ms = sorted(wait * 1000 for wait in self._wait_samples)
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "queue_depth": self._queued,
+                "queued_sessions": len(self._session_queues),
+                "admitted": self._admitted,
+                "rate_limited": self._rate_limited,
+                "shed": self._shed,
+                "service_time_ms": round(self._service_seconds * 1000, 3),
+                "queue_wait_ms": _summarize(waits_ms)
+            }
+
+
+def _summarize(sorted_values: List[float]) -> Dict[str, Optional[float]]:
+    if not sorted_values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+
+    def percentile(fraction: float) -> float:
+        index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+        return round(sorted_values[index], 3)
+
+    return {
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": round(sorted_values[-1], 3)
+    }
+
+
+chat_admission = AdmissionController()
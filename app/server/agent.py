@@ -11,7 +11,14 @@ from tools import (
     order_status,
     inventory_summary
 )
-from models import save_tool_call
+from models import (
+    save_tool_call,
+    save_message,
+    get_session_messages,
+    save_session_branch,
+    get_session_branch
+)
+from db import use_branch
 from tool_declarations import get_all_tool_declarations
 from config import (
     GOOGLE_API_KEY,
@@ -19,7 +26,10 @@ from config import (
     LLM_TEMPERATURE,
     SYSTEM_INSTRUCTION,
     MAX_TOOL_ITERATIONS,
-    DEFAULT_SESSION_ID
+    CONVERSATION_HISTORY_LIMIT,
+    DEFAULT_SESSION_ID,
+    DEFAULT_BRANCH_ID,
+    BRANCH_IDS
 )
 
 
@@ -34,7 +44,14 @@ _TOOL_MAP: Dict[str, Any] = {
     "inventory_summary": inventory_summary
 }
 
+AGENT_ERROR_PREFIX = "Agent Error:"
+
 _chat_sessions: Dict[str, Any] = {}
+_session_branches: Dict[str, str] = {}
+
+
+class SessionBranchError(ValueError):
+    pass
 
 
 def _create_chat_session() -> Any:
@@ -57,6 +74,28 @@ def _get_or_create_chat_session(session_id: str) -> Any:
     return _chat_sessions[session_id]
 
 
+def resolve_session_branch(session_id: str, branch_id: Optional[str] = None) -> str:
+    if branch_id:
+        if branch_id not in BRANCH_IDS:
+            raise SessionBranchError(f"Unknown branch: {branch_id}")
+        if _session_branches.get(session_id) != branch_id:
+            save_session_branch(session_id, branch_id)
+            _session_branches[session_id] = branch_id
+        return branch_id
+    
+    if session_id in _session_branches:
+        return _session_branches[session_id]
+    
+    stored_branch = get_session_branch(session_id) or DEFAULT_BRANCH_ID
+    if stored_branch not in BRANCH_IDS:
+        raise SessionBranchError(
+            f"Session {session_id} is bound to branch {stored_branch}, which is no longer "
+            f"configured. Send branch_id to choose one of: {', '.join(BRANCH_IDS)}"
+        )
+    _session_branches[session_id] = stored_branch
+    return stored_branch
+
+
 def _extract_tool_calls_and_text(parts: List[Any]) -> Tuple[List[Any], List[str]]:
     tool_calls = []
     text_parts = []
@@ -141,9 +180,12 @@ def _extract_final_text(response: Any) -> str:
 def library_agent(
     user_message: str,
     session_id: str = DEFAULT_SESSION_ID,
-    conversation_history: Optional[List[Dict[str, str]]] = None
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    branch_id: Optional[str] = None,
+    executed_tools: Optional[List[str]] = None
 ) -> str:
     try:
+        session_branch = resolve_session_branch(session_id, branch_id)
         chat = _get_or_create_chat_session(session_id)
         
         response = chat.send_message(user_message)
@@ -160,14 +202,16 @@ def library_agent(
                 return "\n".join(text_parts).strip()
             
             if tool_calls:
-                function_responses = [
-                    _execute_tool(
-                        tool_call.name,
-                        tool_call.args or {},
-                        session_id
-                    )
-                    for tool_call in tool_calls
-                ]
+                function_responses = []
+                with use_branch(session_branch):
+                    for tool_call in tool_calls:
+                        if executed_tools is not None:
+                            executed_tools.append(tool_call.name)
+                        function_responses.append(_execute_tool(
+                            tool_call.name,
+                            tool_call.args or {},
+                            session_id
+                        ))
                 
                 response = chat.send_message(function_responses)
             else:
@@ -179,7 +223,72 @@ def library_agent(
     
     except Exception as error:
         error_trace = traceback.format_exc()
-        return f"Agent Error: {str(error)}\n{error_trace}"
+        return f"{AGENT_ERROR_PREFIX} {str(error)}\n{error_trace}"
+
+
+def _load_conversation_history(session_id: str) -> List[Dict[str, str]]:
+    previous_messages = get_session_messages(session_id)
+    return [
+        {"role": msg['role'], "content": msg['content']}
+        for msg in previous_messages[-CONVERSATION_HISTORY_LIMIT:]
+    ]
+
+
+def run_chat_turn(
+    user_message: str,
+    session_id: str = DEFAULT_SESSION_ID,
+    branch_id: Optional[str] = None
+) -> str:
+    branch_id = resolve_session_branch(session_id, branch_id)
+    conversation_history = _load_conversation_history(session_id)
+    
+    save_message(session_id, 'user', user_message)
+    
+    agent_response = library_agent(user_message, session_id, conversation_history, branch_id)
+    
+    save_message(session_id, 'assistant', agent_response)
+    
+    return agent_response
+
+
+def run_tracked_chat_turn(
+    user_message: str,
+    session_id: str = DEFAULT_SESSION_ID,
+    branch_id: Optional[str] = None
+) -> Dict[str, Any]:
+    branch_id = resolve_session_branch(session_id, branch_id)
+    conversation_history = _load_conversation_history(session_id)
+    
+    executed_tools: List[str] = []
+    agent_response = library_agent(
+        user_message,
+        session_id,
+        conversation_history,
+        branch_id,
+        executed_tools
+    )
+    failed = agent_response.startswith(AGENT_ERROR_PREFIX)
+    
+    if failed and not executed_tools:
+        return {
+            "response": None,
+            "error": agent_response,
+            "retryable": True,
+            "executed_tools": executed_tools
+        }
+    
+    try:
+        save_message(session_id, 'user', user_message)
+        save_message(session_id, 'assistant', agent_response)
+    except Exception as save_error:
+        print(f"Warning: Failed to save chat turn for session {session_id}: {save_error}")
+    
+    return {
+        "response": None if failed else agent_response,
+        "error": agent_response if failed else None,
+        "retryable": False,
+        "executed_tools": executed_tools
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,292 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Any, Optional, Set, Tuple
+
+from fuzzy_index import build_fuzzy_indexes
+from config import (
+    BRANCH_IDS,
+    BATCH_WORKERS,
+    BATCH_MAX_PENDING_PER_WORKER,
+    BATCH_PROGRESS_INTERVAL
+)
+
+
+BatchRequest = Dict[str, Any]
+ChatTurn = Callable[[str, str, Optional[str]], Dict[str, Any]]
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return round(sorted_values[index], 3)
+
+
+def load_checkpoint(output_path: Path) -> Set[int]:
+    if not output_path.exists():
+        return set()
+
+    with open(output_path, "rb") as output_file:
+        content = output_file.read()
+
+    kept_lines = []
+    completed = set()
+    for line in content.split(b"\n")[:-1]:
+        if not line.strip():
+            continue
+        try:
+            result = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if result.get("retryable"):
+            continue
+        kept_lines.append(line + b"\n")
+        completed.add(result["line"])
+
+    kept_content = b"".join(kept_lines)
+    if kept_content != content:
+        temporary_path = output_path.with_name(output_path.name + ".tmp")
+        with open(temporary_path, "wb") as temporary_file:
+            temporary_file.write(kept_content)
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+        os.replace(temporary_path, output_path)
+
+    return completed
+
+
+def read_requests(input_path: Path) -> Iterator[Tuple[int, Optional[BatchRequest], Optional[str]]]:
+    with open(input_path, "r", encoding="utf-8") as input_file:
+        for line_number, line in enumerate(input_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line), None
+            except json.JSONDecodeError as error:
+                yield line_number, None, f"Invalid JSON: {error}"
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        output_path: Path,
+        chat_turn: ChatTurn,
+        workers: int = BATCH_WORKERS,
+        max_pending: Optional[int] = None
+    ):
+        self.output_path = output_path
+        self.chat_turn = chat_turn
+        self.workers = workers
+        self.max_pending = max_pending or workers * BATCH_MAX_PENDING_PER_WORKER
+
+        self._condition = threading.Condition()
+        self._session_queues: Dict[str, Deque[Tuple[int, BatchRequest]]] = {}
+        self._pending = 0
+        self._write_lock = threading.Lock()
+        self._latencies_ms: List[float] = []
+        self._succeeded = 0
+        self._failed = 0
+        self._abandoned = 0
+        self._abandoned_sessions: Set[str] = set()
+
+    def _write_result(self, output_file: Any, result: Dict[str, Any]) -> None:
+        with self._write_lock:
+            output_file.write(json.dumps(result) + "\n")
+            output_file.flush()
+            if result["error"] is None:
+                self._succeeded += 1
+            else:
+                self._failed += 1
+            if result["latency_ms"] is not None:
+                self._latencies_ms.append(result["latency_ms"])
+
+            completed = self._succeeded + self._failed
+            if completed % BATCH_PROGRESS_INTERVAL == 0:
+                print(f"Batch: {completed} requests completed")
+
+    def _run_request(self, line_number: int, request: BatchRequest) -> Dict[str, Any]:
+        session_id = request["session_id"]
+        started = time.perf_counter()
+
+        try:
+            turn = self.chat_turn(request["message"], session_id, request.get("branch_id"))
+        except ValueError as error:
+            turn = {"error": f"{type(error).__name__}: {error}", "retryable": False}
+        except Exception as error:
+            turn = {"error": f"{type(error).__name__}: {error}", "retryable": True}
+
+        if not isinstance(turn, dict):
+            turn = {
+                "error": f"TypeError: Agent returned {type(turn).__name__}, expected dict",
+                "retryable": False
+            }
+
+        return {
+            "line": line_number,
+            "request_id": request.get("request_id"),
+            "session_id": session_id,
+            "response": turn.get("response"),
+            "error": turn.get("error"),
+            "retryable": bool(turn.get("retryable")),
+            "executed_tools": turn.get("executed_tools") or [],
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def _process(self, line_number: int, request: BatchRequest, output_file: Any) -> Optional[str]:
+        result = self._run_request(line_number, request)
+        self._write_result(output_file, result)
+        return result["error"] if result["retryable"] else None
+
+    def _abandon_session(self, session_id: str, reason: str) -> None:
+        with self._condition:
+            remaining = self._session_queues.pop(session_id, deque())
+            self._abandoned_sessions.add(session_id)
+            self._abandoned += len(remaining)
+            self._pending -= len(remaining)
+            self._condition.notify_all()
+        print(f"Warning: Batch session {session_id} stopped, "
+              f"{len(remaining) + 1} requests left for the next run: {reason}")
+
+    def _drain_session(self, session_id: str, output_file: Any) -> None:
+        while True:
+            with self._condition:
+                session_queue = self._session_queues[session_id]
+                if not session_queue:
+                    del self._session_queues[session_id]
+                    return
+                line_number, request = session_queue.popleft()
+
+            try:
+                retryable_error = self._process(line_number, request, output_file)
+            except BaseException as error:
+                with self._condition:
+                    self._abandoned += 1
+                self._abandon_session(session_id, f"{type(error).__name__}: {error}")
+                return
+            finally:
+                with self._condition:
+                    self._pending -= 1
+                    self._condition.notify_all()
+
+            if retryable_error is not None:
+                self._abandon_session(session_id, retryable_error.splitlines()[0])
+                return
+
+    def _normalize(self, line_number: int, request: Any) -> BatchRequest:
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+
+        message = request.get("message") or request.get("body")
+        if not message or not str(message).strip():
+            raise ValueError("Request has no message")
+
+        return {
+            **request,
+            "message": str(message).strip(),
+            "session_id": request.get("session_id") or f"batch-{line_number}"
+        }
+
+    def run(self, input_path: Path, resume: bool = True) -> Dict[str, Any]:
+        completed_lines = load_checkpoint(self.output_path) if resume else set()
+        if not resume and self.output_path.exists():
+            self.output_path.unlink()
+
+        skipped = 0
+        drainers: List[Future] = []
+        started = time.perf_counter()
+
+        with open(self.output_path, "a", encoding="utf-8") as output_file, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            for line_number, request, parse_error in read_requests(input_path):
+                if line_number in completed_lines:
+                    skipped += 1
+                    continue
+
+                try:
+                    if parse_error:
+                        raise ValueError(parse_error)
+                    request = self._normalize(line_number, request)
+                except ValueError as error:
+                    raw_request = request if isinstance(request, dict) else {}
+                    self._write_result(output_file, {
+                        "line": line_number,
+                        "request_id": raw_request.get("request_id"),
+                        "session_id": raw_request.get("session_id"),
+                        "response": None,
+                        "error": str(error),
+                        "retryable": False,
+                        "latency_ms": None
+                    })
+                    continue
+
+                with self._condition:
+                    while self._pending >= self.max_pending:
+                        self._condition.wait()
+
+                    session_id = request["session_id"]
+                    if session_id in self._abandoned_sessions:
+                        self._abandoned += 1
+                        continue
+
+                    self._pending += 1
+                    is_idle = session_id not in self._session_queues
+                    self._session_queues.setdefault(session_id, deque()).append((line_number, request))
+
+                if is_idle:
+                    drainers.append(executor.submit(self._drain_session, session_id, output_file))
+
+        for drainer in drainers:
+            drainer.result()
+
+        elapsed = time.perf_counter() - started
+        latencies = sorted(self._latencies_ms)
+        processed = self._succeeded + self._failed
+
+        return {
+            "processed": processed,
+            "succeeded": self._succeeded,
+            "failed": self._failed,
+            "skipped": skipped,
+            "abandoned": self._abandoned,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(processed / elapsed, 3) if elapsed > 0 else None,
+            "latency_ms": {
+                "p50": _percentile(latencies, 0.5),
+                "p95": _percentile(latencies, 0.95),
+                "p99": _percentile(latencies, 0.99),
+                "max": round(latencies[-1], 3) if latencies else None
+            }
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a JSONL file of chat requests through the library agent")
+    parser.add_argument("input", type=Path, help="JSONL file with one {message, session_id?, branch_id?} per line")
+    parser.add_argument("output", type=Path, help="JSONL file for results; also the resume checkpoint")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--no-resume", action="store_true", help="Discard existing output and start over")
+    args = parser.parse_args()
+
+    from agent import run_tracked_chat_turn
+
+    for branch_id in BRANCH_IDS:
+        build_fuzzy_indexes(branch_id)
+
+    runner = BatchRunner(args.output, run_tracked_chat_turn, workers=args.workers)
+    summary = runner.run(args.input, resume=not args.no_resume)
+
+    print(f"Processed {summary['processed']} requests in {summary['seconds']}s "
+          f"({summary['requests_per_second']} req/s), skipped {summary['skipped']} already completed")
+    print(f"Succeeded: {summary['succeeded']}, failed: {summary['failed']}, "
+          f"left for the next run: {summary['abandoned']}")
+    print(f"Latency ms: {summary['latency_ms']}")
+
+
+if __name__ == "__main__":
+    main()
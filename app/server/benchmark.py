@@ -0,0 +1,459 @@
+import argparse
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, List, Any, Optional
+
+from config import BRANCH_DATABASE_PATHS
+from admission import AdmissionController, AdmissionRejected
+from coalescing import SingleFlight
+from datagen import generate_dataset
+from db import get_connection, use_branch
+from fuzzy_index import build_fuzzy_indexes
+from sharding import fan_out, _query_shard
+from reservations import StockContentionError, StockUnavailableError
+from tools import _query_books, _query_low_stock, create_order
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return round(ordered[index], 3)
+
+
+def _time_ms(operation: Callable[[], Any], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(median(timings), 3)
+
+
+def bench_fan_out(shard_counts: List[int], books_per_shard: int, runs: int) -> List[Dict[str, Any]]:
+    results = []
+
+    def query(connection: sqlite3.Connection) -> List[Dict[str, Any]]:
+        return _query_books(connection, "Clean Code", "title")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        branch_ids = []
+        for shard_index in range(max(shard_counts)):
+            branch_id = f"bench-{shard_index}"
+            shard_path = Path(temp_dir) / f"{branch_id}.db"
+            generate_dataset(
+                shard_path,
+                books=books_per_shard,
+                customers=100,
+                order_lines=0,
+                messages=0,
+                seed=shard_index
+            )
+            BRANCH_DATABASE_PATHS[branch_id] = shard_path
+            branch_ids.append(branch_id)
+
+        try:
+            for shard_count in shard_counts:
+                branches = branch_ids[:shard_count]
+                sequential_ms = _time_ms(
+                    lambda: [_query_shard(branch_id, query) for branch_id in branches],
+                    runs
+                )
+                parallel_ms = _time_ms(lambda: fan_out(query, branches), runs)
+                results.append({
+                    "shards": shard_count,
+                    "sequential_ms": sequential_ms,
+                    "fan_out_ms": parallel_ms,
+                    "speedup": round(sequential_ms / parallel_ms, 2) if parallel_ms else None
+                })
+        finally:
+            for branch_id in branch_ids:
+                BRANCH_DATABASE_PATHS.pop(branch_id, None)
+
+    return results
+
+
+def _run_read_burst(
+    branch_id: str,
+    threads: int,
+    rounds: int,
+    group: Optional[SingleFlight]
+) -> Dict[str, Any]:
+    queries = (
+        (("find_books", "python", "title"), lambda connection: _query_books(connection, "python", "title")),
+        (("inventory_summary",), _query_low_stock)
+    )
+    barrier = threading.Barrier(threads)
+    counter_lock = threading.Lock()
+    latencies_ms: List[float] = []
+    db_executions = [0]
+
+    def worker(worker_index: int) -> None:
+        with use_branch(branch_id):
+            for round_index in range(rounds):
+                key, query = queries[(worker_index + round_index) % len(queries)]
+
+                def execute() -> List[Dict[str, Any]]:
+                    with counter_lock:
+                        db_executions[0] += 1
+                    with get_connection() as connection:
+                        return query(connection)
+
+                barrier.wait()
+                started = time.perf_counter()
+                if group is None:
+                    execute()
+                else:
+                    group.do(key, execute)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with counter_lock:
+                    latencies_ms.append(elapsed_ms)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "mode": "direct" if group is None else "single-flight",
+        "calls": len(latencies_ms),
+        "db_executions": db_executions[0],
+        "wall_ms": round(wall_ms, 3),
+        "p50_ms": _percentile(latencies_ms, 0.5),
+        "p95_ms": _percentile(latencies_ms, 0.95)
+    }
+
+
+def bench_coalescing(threads: int, rounds: int, books: int) -> List[Dict[str, Any]]:
+    branch_id = "bench-coalescing"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shard_path = Path(temp_dir) / f"{branch_id}.db"
+        generate_dataset(shard_path, books=books, customers=100, order_lines=0, messages=0)
+        BRANCH_DATABASE_PATHS[branch_id] = shard_path
+
+        try:
+            return [
+                _run_read_burst(branch_id, threads, rounds, None),
+                _run_read_burst(branch_id, threads, rounds, SingleFlight("bench"))
+            ]
+        finally:
+            BRANCH_DATABASE_PATHS.pop(branch_id, None)
+
+
+def _run_overload(
+    controller: Optional[AdmissionController],
+    capacity: int,
+    service_seconds: float,
+    arrival_rate: float,
+    duration_seconds: float,
+    sessions: int,
+    hot_session_share: float,
+    seed: int
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    backend = threading.Semaphore(capacity)
+    results_lock = threading.Lock()
+    latencies_ms: List[float] = []
+    outcomes = {"ok": 0, "rate_limited": 0, "shed": 0}
+
+    def simulated_chat() -> None:
+        with backend:
+            time.sleep(service_seconds)
+
+    def client(session_id: str) -> None:
+        started = time.perf_counter()
+        try:
+            if controller is None:
+                simulated_chat()
+            else:
+                with controller.admit(session_id):
+                    simulated_chat()
+        except AdmissionRejected as rejection:
+            with results_lock:
+                outcomes["rate_limited" if rejection.status_code == 429 else "shed"] += 1
+            return
+        with results_lock:
+            outcomes["ok"] += 1
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    threads = []
+    started = time.perf_counter()
+    next_arrival = 0.0
+    while next_arrival < duration_seconds:
+        delay = next_arrival - (time.perf_counter() - started)
+        if delay > 0:
+            time.sleep(delay)
+        if rng.random() < hot_session_share:
+            session_id = "hot"
+        else:
+            session_id = f"session-{rng.randrange(sessions)}"
+        thread = threading.Thread(target=client, args=(session_id,))
+        thread.start()
+        threads.append(thread)
+        next_arrival += rng.expovariate(arrival_rate)
+
+    for thread in threads:
+        thread.join()
+
+    wall_seconds = time.perf_counter() - started
+    return {
+        "mode": "unbounded" if controller is None else "admission",
+        "requests": len(threads),
+        **outcomes,
+        "goodput_rps": round(outcomes["ok"] / wall_seconds, 2),
+        "p50_ms": _percentile(latencies_ms, 0.5) if latencies_ms else None,
+        "p99_ms": _percentile(latencies_ms, 0.99) if latencies_ms else None,
+        "max_ms": round(max(latencies_ms), 3) if latencies_ms else None
+    }
+
+
+def bench_admission(
+    capacity: int,
+    service_seconds: float,
+    overload: float,
+    duration_seconds: float,
+    sessions: int,
+    slo_seconds: float
+) -> List[Dict[str, Any]]:
+    arrival_rate = overload * capacity / service_seconds
+    hot_session_share = 0.3
+    fair_session_rate = arrival_rate * (1 - hot_session_share) / sessions
+
+    controller = AdmissionController(
+        max_concurrency=capacity,
+        max_queue_size=capacity * 50,
+        queue_slo_seconds=slo_seconds,
+        rate_per_second=fair_session_rate * 2,
+        burst=5,
+        initial_service_seconds=service_seconds
+    )
+
+    scenario = (capacity, service_seconds, arrival_rate, duration_seconds, sessions, hot_session_share, 7)
+    return [
+        _run_overload(None, *scenario),
+        _run_overload(controller, *scenario)
+    ]
+
+
+def _run_order_storm(
+    branch_id: str,
+    isbn: str,
+    threads: int,
+    attempts_per_thread: int,
+    blind: bool
+) -> Dict[str, Any]:
+    counter_lock = threading.Lock()
+    outcomes = {"orders": 0, "out_of_stock": 0, "contention": 0, "failed": 0}
+
+    def place_blind_order() -> None:
+        with closing(get_connection()) as connection:
+            cursor = connection.execute("INSERT INTO orders (customer_id) VALUES (1)")
+            connection.execute(
+                "INSERT INTO order_items (order_id, isbn, qty) VALUES (?, ?, 1)",
+                (cursor.lastrowid, isbn)
+            )
+            connection.execute("UPDATE books SET stock = stock - 1 WHERE isbn = ?", (isbn,))
+            connection.commit()
+
+    def worker() -> None:
+        with use_branch(branch_id):
+            for _ in range(attempts_per_thread):
+                try:
+                    if blind:
+                        place_blind_order()
+                    else:
+                        create_order.invoke({"customer_id": 1, "items": [{"isbn": isbn, "qty": 1}]})
+                    outcome = "orders"
+                except ValueError as error:
+                    cause = error.__cause__ or error
+                    if isinstance(cause, StockContentionError):
+                        outcome = "contention"
+                    elif isinstance(cause, StockUnavailableError):
+                        outcome = "out_of_stock"
+                    else:
+                        outcome = "failed"
+                with counter_lock:
+                    outcomes[outcome] += 1
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    with closing(get_connection(branch_id)) as connection:
+        final_stock = connection.execute(
+            "SELECT stock FROM books WHERE isbn = ?", (isbn,)
+        ).fetchone()[0]
+        sold = connection.execute(
+            "SELECT COALESCE(SUM(qty), 0) FROM order_items WHERE isbn = ?", (isbn,)
+        ).fetchone()[0]
+
+    return {
+        "mode": "blind-update" if blind else "reservations",
+        "attempts": threads * attempts_per_thread,
+        **outcomes,
+        "sold": sold,
+        "final_stock": final_stock,
+        "oversold": max(0, -final_stock),
+        "orders_per_second": round(outcomes["orders"] / wall_seconds, 2)
+    }
+
+
+def bench_contention(threads: int, attempts_per_thread: int, initial_stock: int) -> List[Dict[str, Any]]:
+    results = []
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for blind in (True, False):
+            branch_id = f"bench-contention-{'blind' if blind else 'reservations'}"
+            shard_path = Path(temp_dir) / f"{branch_id}.db"
+            generate_dataset(shard_path, books=1000, customers=10, order_lines=0, messages=0)
+            BRANCH_DATABASE_PATHS[branch_id] = shard_path
+
+            with closing(get_connection(branch_id)) as connection:
+                isbn = connection.execute("SELECT isbn FROM books LIMIT 1").fetchone()[0]
+                connection.execute("UPDATE books SET stock = ? WHERE isbn = ?", (initial_stock, isbn))
+                connection.commit()
+
+            try:
+                results.append(_run_order_storm(branch_id, isbn, threads, attempts_per_thread, blind))
+            finally:
+                BRANCH_DATABASE_PATHS.pop(branch_id, None)
+
+    return results
+
+
+def _introduce_typo(text: str, rng: random.Random) -> str:
+    position = rng.randrange(1, len(text) - 1)
+    if rng.random() < 0.5:
+        return text[:position] + text[position + 1:]
+    return text[:position] + text[position] + text[position:]
+
+
+def bench_fuzzy(books: int, queries: int) -> List[Dict[str, Any]]:
+    branch_id = "bench-fuzzy"
+    rng = random.Random(11)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shard_path = Path(temp_dir) / f"{branch_id}.db"
+        generate_dataset(shard_path, books=books, customers=10, order_lines=0, messages=0)
+        BRANCH_DATABASE_PATHS[branch_id] = shard_path
+
+        try:
+            started = time.perf_counter()
+            title_index = build_fuzzy_indexes(branch_id)["title"]
+            build_seconds = time.perf_counter() - started
+
+            with closing(get_connection(branch_id)) as connection:
+                samples = [
+                    (row['isbn'], _introduce_typo(row['title'], rng))
+                    for row in connection.execute(
+                        "SELECT isbn, title FROM books ORDER BY random() LIMIT ?",
+                        (queries,)
+                    )
+                ]
+
+                like_ms = []
+                for _, typo_title in samples[:min(len(samples), 20)]:
+                    query_started = time.perf_counter()
+                    _query_books(connection, typo_title, "title")
+                    like_ms.append((time.perf_counter() - query_started) * 1000)
+
+            fuzzy_ms = []
+            hits = 0
+            for isbn, typo_title in samples:
+                query_started = time.perf_counter()
+                matches = title_index.search(typo_title)
+                fuzzy_ms.append((time.perf_counter() - query_started) * 1000)
+                hits += any(match_isbn == isbn for match_isbn, _ in matches)
+
+            stats = title_index.get_stats()
+        finally:
+            BRANCH_DATABASE_PATHS.pop(branch_id, None)
+
+    return [{
+        "books": books,
+        "build_s": round(build_seconds, 3),
+        "memory_mb": round(stats["memory_bytes"] / 1024 / 1024, 2),
+        "posting_mb": round(stats["posting_bytes"] / 1024 / 1024, 2),
+        "fuzzy_p50_ms": _percentile(fuzzy_ms, 0.5),
+        "fuzzy_p95_ms": _percentile(fuzzy_ms, 0.95),
+        "like_p50_ms": _percentile(like_ms, 0.5),
+        "recall": round(hits / len(samples), 3)
+    }]
+
+
+def _print_table(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    headers = list(rows[0])
+    print("  ".join(f"{header:>14}" for header in headers))
+    for row in rows:
+        print("  ".join(f"{str(row[header]):>14}" for header in headers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Library Desk Agent benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fan_out_parser = subparsers.add_parser("fan-out", help="Cross-branch fan-out latency vs shard count")
+    fan_out_parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    fan_out_parser.add_argument("--books-per-shard", type=int, default=50000)
+    fan_out_parser.add_argument("--runs", type=int, default=5)
+
+    coalescing_parser = subparsers.add_parser("coalescing", help="Concurrent identical reads with and without single-flight")
+    coalescing_parser.add_argument("--threads", type=int, default=16)
+    coalescing_parser.add_argument("--rounds", type=int, default=20)
+    coalescing_parser.add_argument("--books", type=int, default=100000)
+
+    admission_parser = subparsers.add_parser("admission", help="/api/chat tail latency under overload")
+    admission_parser.add_argument("--capacity", type=int, default=4)
+    admission_parser.add_argument("--service-ms", type=float, default=100)
+    admission_parser.add_argument("--overload", type=float, default=2.0)
+    admission_parser.add_argument("--duration", type=float, default=5.0)
+    admission_parser.add_argument("--sessions", type=int, default=20)
+    admission_parser.add_argument("--slo-ms", type=float, default=500)
+
+    contention_parser = subparsers.add_parser("contention", help="Concurrent orders for one hot title")
+    contention_parser.add_argument("--threads", type=int, default=16)
+    contention_parser.add_argument("--attempts", type=int, default=20)
+    contention_parser.add_argument("--stock", type=int, default=100)
+
+    fuzzy_parser = subparsers.add_parser("fuzzy", help="Trigram index build time, memory and typo lookups")
+    fuzzy_parser.add_argument("--books", type=int, default=100000)
+    fuzzy_parser.add_argument("--queries", type=int, default=200)
+
+    args = parser.parse_args()
+
+    if args.command == "fan-out":
+        _print_table(bench_fan_out(args.shards, args.books_per_shard, args.runs))
+    elif args.command == "coalescing":
+        _print_table(bench_coalescing(args.threads, args.rounds, args.books))
+    elif args.command == "contention":
+        _print_table(bench_contention(args.threads, args.attempts, args.stock))
+    elif args.command == "fuzzy":
+        _print_table(bench_fuzzy(args.books, args.queries))
+    elif args.command == "admission":
+        _print_table(bench_admission(
+            args.capacity,
+            args.service_ms / 1000,
+            args.overload,
+            args.duration,
+            args.sessions,
+            args.slo_ms / 1000
+        ))
+
+
+if __name__ == "__main__":
+    main()
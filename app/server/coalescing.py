@@ -0,0 +1,82 @@
+import threading
+from typing import Callable, Dict, Hashable, Any, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[int, Hashable], _InFlightCall] = {}
+        self._generation = 0
+        self._executions = 0
+        self._coalesced = 0
+        self._invalidations = 0
+
+    def do(self, key: Hashable, function: Callable[[], T]) -> T:
+        with self._lock:
+            call_key = (self._generation, key)
+            call = self._calls.get(call_key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[call_key] = call
+                self._executions += 1
+            else:
+                self._coalesced += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(call_key) is call:
+                    del self._calls[call_key]
+            call.done.set()
+
+        return call.result
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total_calls = self._executions + self._coalesced
+            return {
+                "name": self.name,
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "invalidations": self._invalidations,
+                "in_flight": len(self._calls),
+                "coalesced_ratio": round(self._coalesced / total_calls, 4) if total_calls else 0.0
+            }
+
+
+catalog_reads = SingleFlight("catalog")
+chat_reads = SingleFlight("chat")
+
+
+def get_coalescing_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        group.name: group.get_stats()
+        for group in (catalog_reads, chat_reads)
+    }
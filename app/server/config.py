@@ -9,15 +9,61 @@ GEMINI_MODEL_NAME = "gemini-2.0-flash"
 LLM_TEMPERATURE = 0.0
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
-DATABASE_PATH = PROJECT_ROOT / "app" / "db" / "library.db"
+DATABASE_PATH = PROJECT_ROOT / os.getenv('DB_PATH', 'app/db/library.db')
+ARCHIVE_DATABASE_PATH = DATABASE_PATH.with_name(f"{DATABASE_PATH.stem}_archive.db")
+
+DEFAULT_BRANCH_ID = "main"
+BRANCH_IDS = tuple(dict.fromkeys(
+    [DEFAULT_BRANCH_ID] + [
+        branch.strip()
+        for branch in os.getenv('LIBRARY_BRANCHES', DEFAULT_BRANCH_ID).split(',')
+        if branch.strip()
+    ]
+))
+BRANCH_DATABASE_PATHS = {
+    branch: DATABASE_PATH if branch == DEFAULT_BRANCH_ID
+    else DATABASE_PATH.with_name(f"{DATABASE_PATH.stem}_{branch}.db")
+    for branch in BRANCH_IDS
+}
+FAN_OUT_MAX_WORKERS = 8
 
 MAX_TOOL_ITERATIONS = 5
+
+CHAT_MAX_CONCURRENCY = int(os.getenv('CHAT_MAX_CONCURRENCY', '4'))
+CHAT_MAX_QUEUE_SIZE = 100
+CHAT_QUEUE_SLO_SECONDS = float(os.getenv('CHAT_QUEUE_SLO_SECONDS', '10'))
+CHAT_RATE_LIMIT_PER_SECOND = float(os.getenv('CHAT_RATE_LIMIT_PER_SECOND', '0.5'))
+CHAT_RATE_LIMIT_BURST = 5
+CHAT_INITIAL_SERVICE_SECONDS = 3.0
 CONVERSATION_HISTORY_LIMIT = 10
 DEFAULT_SESSION_ID = "default"
 
 LOW_STOCK_THRESHOLD = 5
+
+RESERVATION_TTL_SECONDS = 300
+RESERVATION_SWEEP_INTERVAL_SECONDS = 30
+STOCK_CAS_MAX_RETRIES = 20
+STOCK_CAS_BACKOFF_SECONDS = 0.002
 VALID_SEARCH_FIELDS = ("title", "author")
 
+FUZZY_MIN_SIMILARITY = 0.6
+FUZZY_MATCH_LIMIT = 5
+FUZZY_POSTING_BUDGET = 10000
+FUZZY_CANDIDATE_FACTOR = 5
+
+PAYLOAD_COMPRESSION_THRESHOLD = 1024
+PAYLOAD_COMPRESSION_LEVEL = 6
+
+RETENTION_MAX_AGE_DAYS = int(os.getenv('RETENTION_MAX_AGE_DAYS', '30'))
+RETENTION_INTERVAL_SECONDS = int(os.getenv('RETENTION_INTERVAL_SECONDS', '3600'))
+RETENTION_BATCH_SIZE = 500
+INCREMENTAL_VACUUM_PAGES = 1000
+RETENTION_PROBE_RUNS = 5
+
+BATCH_WORKERS = 8
+BATCH_MAX_PENDING_PER_WORKER = 4
+BATCH_PROGRESS_INTERVAL = 100
+
 DEFAULT_PORT = 5000
 DEFAULT_HOST = "0.0.0.0"
 
@@ -0,0 +1,339 @@
+import argparse
+import random
+import sqlite3
+import time
+from bisect import bisect_left
+from contextlib import closing
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Any, Tuple
+
+from config import PROJECT_ROOT
+
+
+SCHEMA_PATH = PROJECT_ROOT / "app" / "db" / "schema.sql"
+DEFAULT_OUTPUT_PATH = PROJECT_ROOT / "app" / "db" / "library_load.db"
+
+DEFAULT_SEED = 42
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_ZIPF_EXPONENT = 1.1
+MAX_ITEMS_PER_ORDER = 5
+MESSAGES_PER_SESSION = 20
+HISTORY_DAYS = 365
+HISTORY_START = datetime(2025, 1, 1)
+
+_TITLE_WORDS = (
+    "Clean", "Code", "Python", "Design", "Patterns", "Effective", "Modern",
+    "Pragmatic", "Programmer", "Data", "Intensive", "Applications", "Systems",
+    "Java", "Rust", "Distributed", "Algorithms", "Refactoring", "Testing",
+    "Architecture", "Domain", "Driven", "Fluent", "Concurrency", "Networks",
+    "Compilers", "Databases", "Security", "Cloud", "Machine", "Learning",
+    "Functional", "Reactive", "Practical", "Essential", "Advanced", "Guide"
+)
+
+_FIRST_NAMES = (
+    "Alice", "Bob", "Charlie", "Dina", "Ehab", "Faris", "Grace", "Hana",
+    "Ivan", "Julia", "Karim", "Lena", "Malik", "Nora", "Omar", "Priya",
+    "Quinn", "Rania", "Sami", "Tara", "Usman", "Vera", "Yusuf", "Zara"
+)
+
+_LAST_NAMES = (
+    "Martin", "Hunt", "Bloch", "Kleppmann", "Freeman", "Evans", "Meyers",
+    "Ramalho", "Walls", "Fowler", "Beck", "Knuth", "Tanenbaum", "Stroustrup",
+    "Kernighan", "Ritchie", "Liskov", "Hopper", "Lovelace", "Dijkstra"
+)
+
+_USER_TEMPLATES = (
+    "Do you have {title}?",
+    "We sold {qty} copies of {title} to customer {customer}. Create the order.",
+    "Restock {title} by {qty} copies.",
+    "What's the status of order {order}?",
+    "Show me all low-stock books"
+)
+
+_ASSISTANT_TEMPLATES = (
+    "Yes, {title} is in stock with {qty} copies.",
+    "Order {order} has been created for customer {customer}.",
+    "{title} has been restocked by {qty} copies.",
+    "Order {order} contains {qty} copies of {title}.",
+    "There are {qty} books below the low-stock threshold."
+)
+
+
+class ZipfSampler:
+    def __init__(self, item_count: int, exponent: float, rng: random.Random):
+        weights = (1.0 / (rank ** exponent) for rank in range(1, item_count + 1))
+        self._cumulative = list(accumulate(weights))
+        self._total = self._cumulative[-1]
+        self._ranked_items = list(range(item_count))
+        rng.shuffle(self._ranked_items)
+        self._rng = rng
+
+    def sample(self) -> int:
+        rank = bisect_left(self._cumulative, self._rng.random() * self._total)
+        return self._ranked_items[min(rank, len(self._ranked_items) - 1)]
+
+
+def _isbn(book_index: int) -> str:
+    return f"978{book_index:010d}"
+
+
+def _title(book_index: int) -> str:
+    word_count = len(_TITLE_WORDS)
+    words = (
+        _TITLE_WORDS[book_index % word_count],
+        _TITLE_WORDS[(book_index // word_count) % word_count],
+        _TITLE_WORDS[(book_index // word_count ** 2 + 7) % word_count]
+    )
+    return f"{' '.join(words)} Vol. {book_index}"
+
+
+def _random_datetime(start: datetime, rng: random.Random) -> datetime:
+    return start + timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 3600))
+
+
+def _timestamp(start: datetime, rng: random.Random) -> str:
+    return _random_datetime(start, rng).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _generate_books(count: int, rng: random.Random) -> Iterator[Tuple[Any, ...]]:
+    for book_index in range(count):
+        yield (
+            _isbn(book_index),
+            _title(book_index),
+            f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}",
+            round(rng.uniform(10, 90), 2),
+            rng.randrange(0, 50)
+        )
+
+
+def _generate_customers(count: int, rng: random.Random) -> Iterator[Tuple[Any, ...]]:
+    for customer_id in range(1, count + 1):
+        first_name = rng.choice(_FIRST_NAMES)
+        yield (
+            customer_id,
+            f"{first_name} {rng.choice(_LAST_NAMES)}",
+            f"{first_name.lower()}.{customer_id}@example.com"
+        )
+
+
+def _generate_orders(
+    line_count: int,
+    book_sampler: ZipfSampler,
+    customer_sampler: ZipfSampler,
+    rng: random.Random
+) -> Iterator[Tuple[Tuple[Any, ...], List[Tuple[Any, ...]]]]:
+    start = HISTORY_START
+    order_id = 0
+    lines_written = 0
+
+    while lines_written < line_count:
+        order_id += 1
+        order = (order_id, customer_sampler.sample() + 1, _timestamp(start, rng))
+
+        item_count = min(rng.randint(1, MAX_ITEMS_PER_ORDER), line_count - lines_written)
+        isbn_indexes = {book_sampler.sample() for _ in range(item_count)}
+        lines = [
+            (order_id, _isbn(isbn_index), rng.randint(1, 3))
+            for isbn_index in isbn_indexes
+        ]
+        lines_written += len(lines)
+        yield order, lines
+
+
+def _generate_messages(
+    count: int,
+    book_count: int,
+    customer_count: int,
+    book_sampler: ZipfSampler,
+    rng: random.Random
+) -> Iterator[Tuple[Any, ...]]:
+    start = HISTORY_START
+    created_at = start
+
+    for message_index in range(count):
+        session_index = message_index // MESSAGES_PER_SESSION
+        if message_index % MESSAGES_PER_SESSION == 0:
+            created_at = _random_datetime(start, rng)
+
+        is_user = message_index % 2 == 0
+        if is_user:
+            template_index = rng.randrange(len(_USER_TEMPLATES))
+        templates = _USER_TEMPLATES if is_user else _ASSISTANT_TEMPLATES
+        content = templates[template_index].format(
+            title=_title(book_sampler.sample()) if book_count else "Clean Code",
+            qty=rng.randint(1, 10),
+            customer=rng.randint(1, max(customer_count, 1)),
+            order=rng.randint(1, 1000)
+        )
+
+        created_at += timedelta(seconds=rng.randint(2, 90))
+        yield (
+            f"session-{session_index:07d}",
+            "user" if is_user else "assistant",
+            content,
+            created_at.strftime("%Y-%m-%d %H:%M:%S")
+        )
+
+
+def _insert_batched(
+    connection: sqlite3.Connection,
+    sql: str,
+    rows: Iterable[Tuple[Any, ...]],
+    batch_size: int
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    inserted = 0
+    row_iterator = iter(rows)
+
+    while True:
+        batch = list(islice(row_iterator, batch_size))
+        if not batch:
+            break
+        connection.executemany(sql, batch)
+        inserted += len(batch)
+
+    return _throughput(inserted, time.perf_counter() - started)
+
+
+def _insert_orders(
+    connection: sqlite3.Connection,
+    generated_orders: Iterable[Tuple[Tuple[Any, ...], List[Tuple[Any, ...]]]],
+    batch_size: int
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    started = time.perf_counter()
+    order_batch: List[Tuple[Any, ...]] = []
+    line_batch: List[Tuple[Any, ...]] = []
+    order_count = 0
+    line_count = 0
+
+    def flush() -> None:
+        connection.executemany(
+            "INSERT INTO orders (id, customer_id, created_at) VALUES (?, ?, ?)",
+            order_batch
+        )
+        connection.executemany(
+            "INSERT INTO order_items (order_id, isbn, qty) VALUES (?, ?, ?)",
+            line_batch
+        )
+        order_batch.clear()
+        line_batch.clear()
+
+    for order, lines in generated_orders:
+        order_batch.append(order)
+        line_batch.extend(lines)
+        order_count += 1
+        line_count += len(lines)
+        if len(line_batch) >= batch_size:
+            flush()
+
+    flush()
+    elapsed = time.perf_counter() - started
+    return _throughput(order_count, elapsed), _throughput(line_count, elapsed)
+
+
+def _throughput(rows: int, elapsed: float) -> Dict[str, Any]:
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed) if elapsed > 0 else rows
+    }
+
+
+def generate_dataset(
+    db_path: Path,
+    books: int = 10000,
+    customers: int = 1000,
+    order_lines: int = 100000,
+    messages: int = 10000,
+    seed: int = DEFAULT_SEED,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    zipf_exponent: float = DEFAULT_ZIPF_EXPONENT
+) -> Dict[str, Any]:
+    db_path = Path(db_path)
+    if db_path.exists():
+        db_path.unlink()
+
+    rng = random.Random(seed)
+    report: Dict[str, Any] = {"db_path": str(db_path), "seed": seed}
+    started = time.perf_counter()
+
+    with closing(sqlite3.connect(str(db_path))) as connection:
+        connection.executescript(SCHEMA_PATH.read_text())
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+
+        report["books"] = _insert_batched(
+            connection,
+            "INSERT INTO books (isbn, title, author, price, stock) VALUES (?, ?, ?, ?, ?)",
+            _generate_books(books, rng),
+            batch_size
+        )
+        report["customers"] = _insert_batched(
+            connection,
+            "INSERT INTO customers (id, name, email) VALUES (?, ?, ?)",
+            _generate_customers(customers, rng),
+            batch_size
+        )
+
+        book_sampler = ZipfSampler(books, zipf_exponent, rng) if books else None
+
+        if order_lines and books and customers:
+            customer_sampler = ZipfSampler(customers, zipf_exponent, rng)
+            report["orders"], report["order_items"] = _insert_orders(
+                connection,
+                _generate_orders(order_lines, book_sampler, customer_sampler, rng),
+                batch_size
+            )
+
+        if messages:
+            report["messages"] = _insert_batched(
+                connection,
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                _generate_messages(messages, books, customers, book_sampler, rng),
+                batch_size
+            )
+
+        connection.commit()
+
+    total_rows = sum(
+        value["rows"] for value in report.values()
+        if isinstance(value, dict)
+    )
+    report["total"] = _throughput(total_rows, time.perf_counter() - started)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic library dataset")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--order-lines", type=int, default=100000)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--zipf-exponent", type=float, default=DEFAULT_ZIPF_EXPONENT)
+    args = parser.parse_args()
+
+    report = generate_dataset(
+        args.output,
+        books=args.books,
+        customers=args.customers,
+        order_lines=args.order_lines,
+        messages=args.messages,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        zipf_exponent=args.zipf_exponent
+    )
+
+    print(f"Generated dataset at {report['db_path']} (seed {report['seed']})")
+    for table in ("books", "customers", "orders", "order_items", "messages", "total"):
+        if table in report:
+            stats = report[table]
+            print(f"- {table}: {stats['rows']} rows in {stats['seconds']}s ({stats['rows_per_second']} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
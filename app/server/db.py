@@ -1,16 +1,47 @@
 import sqlite3
-from contextlib import closing
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from config import DATABASE_PATH
+from typing import Optional, List, Dict, Any, Iterator
+from config import BRANCH_DATABASE_PATHS, DEFAULT_BRANCH_ID
+from coalescing import catalog_reads
 
 
-def get_connection() -> sqlite3.Connection:
-    connection = sqlite3.connect(str(DATABASE_PATH))
+_current_branch: ContextVar[str] = ContextVar("current_branch", default=DEFAULT_BRANCH_ID)
+
+
+def get_database_path(branch_id: Optional[str] = None) -> Path:
+    branch = branch_id or _current_branch.get()
+    if branch not in BRANCH_DATABASE_PATHS:
+        raise ValueError(f"Unknown branch: {branch}")
+    return BRANCH_DATABASE_PATHS[branch]
+
+
+def get_connection(branch_id: Optional[str] = None) -> sqlite3.Connection:
+    database_path = get_database_path(branch_id)
+    if not database_path.exists():
+        raise FileNotFoundError(
+            f"Database not initialized: {database_path} (run python init_db.py)"
+        )
+    connection = sqlite3.connect(f"{database_path.as_uri()}?mode=rw", uri=True)
     connection.row_factory = sqlite3.Row
     return connection
 
 
+def get_current_branch() -> str:
+    return _current_branch.get()
+
+
+@contextmanager
+def use_branch(branch_id: str) -> Iterator[str]:
+    get_database_path(branch_id)
+    token = _current_branch.set(branch_id)
+    try:
+        yield branch_id
+    finally:
+        _current_branch.reset(token)
+
+
 def get_all_books() -> List[Dict[str, Any]]:
     with closing(get_connection()) as connection:
         cursor = connection.execute("SELECT * FROM books")
@@ -30,10 +61,12 @@ def get_customer(customer_id: int) -> Optional[Dict[str, Any]]:
 def update_stock(isbn: str, quantity: int) -> None:
     with closing(get_connection()) as connection:
         connection.execute(
-            "UPDATE books SET stock = ? WHERE isbn = ?",
+            "UPDATE books SET stock = ?, version = version + 1 WHERE isbn = ?",
             (quantity, isbn)
         )
         connection.commit()
+    
+    catalog_reads.invalidate()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,249 @@
+import math
+import re
+import sys
+import threading
+from array import array
+from collections import Counter
+from contextlib import closing
+from typing import Dict, Iterable, List, Any, Optional, Set, Tuple
+
+from db import get_connection
+from config import (
+    VALID_SEARCH_FIELDS,
+    FUZZY_MIN_SIMILARITY,
+    FUZZY_MATCH_LIMIT,
+    FUZZY_POSTING_BUDGET,
+    FUZZY_CANDIDATE_FACTOR
+)
+
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def extract_trigrams(text: str) -> Set[str]:
+    trigrams: Set[str] = set()
+    for word in _NON_ALPHANUMERIC.sub(" ", text.lower()).split():
+        padded = f"  {word} "
+        trigrams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return trigrams
+
+
+class TrigramIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._isbns: List[Optional[str]] = []
+        self._doc_ids: Dict[str, int] = {}
+        self._trigram_ids: Dict[str, int] = {}
+        self._postings: List[array] = []
+        self._doc_trigrams = array("H")
+        self._doc_offsets = array("Q", [0])
+        self._deleted = 0
+
+    def add(self, isbn: str, text: str) -> None:
+        with self._lock:
+            self._remove_locked(isbn)
+            doc_id = len(self._isbns)
+            self._append_locked(doc_id, isbn, self._intern_trigrams_locked(text))
+
+    def _intern_trigrams_locked(self, text: str) -> List[int]:
+        trigram_ids = []
+        for trigram in extract_trigrams(text):
+            trigram_id = self._trigram_ids.get(trigram)
+            if trigram_id is None:
+                trigram_id = self._trigram_ids[trigram] = len(self._postings)
+                self._postings.append(array("I"))
+            trigram_ids.append(trigram_id)
+        return trigram_ids
+
+    def _append_locked(self, doc_id: int, isbn: str, trigram_ids: Iterable[int]) -> None:
+        self._isbns.append(isbn)
+        self._doc_ids[isbn] = doc_id
+        self._doc_trigrams.extend(trigram_ids)
+        self._doc_offsets.append(len(self._doc_trigrams))
+        for trigram_id in trigram_ids:
+            self._postings[trigram_id].append(doc_id)
+
+    def _document_trigrams(self, doc_id: int) -> array:
+        return self._doc_trigrams[self._doc_offsets[doc_id]:self._doc_offsets[doc_id + 1]]
+
+    def remove(self, isbn: str) -> None:
+        with self._lock:
+            self._remove_locked(isbn)
+            if self._deleted > len(self._doc_ids):
+                self._compact_locked()
+
+    def _remove_locked(self, isbn: str) -> None:
+        doc_id = self._doc_ids.pop(isbn, None)
+        if doc_id is not None:
+            self._isbns[doc_id] = None
+            self._deleted += 1
+
+    def _compact_locked(self) -> None:
+        live_documents = [
+            (isbn, self._document_trigrams(doc_id))
+            for doc_id, isbn in enumerate(self._isbns)
+            if isbn is not None
+        ]
+        self._isbns, self._doc_ids = [], {}
+        self._postings = [array("I") for _ in self._postings]
+        self._doc_trigrams = array("H")
+        self._doc_offsets = array("Q", [0])
+        self._deleted = 0
+        for doc_id, (isbn, trigram_ids) in enumerate(live_documents):
+            self._append_locked(doc_id, isbn, trigram_ids)
+
+    def search(
+        self,
+        query: str,
+        limit: int = FUZZY_MATCH_LIMIT,
+        min_similarity: float = FUZZY_MIN_SIMILARITY
+    ) -> List[Tuple[str, float]]:
+        query_trigrams = extract_trigrams(query)
+        if not query_trigrams:
+            return []
+
+        with self._lock:
+            return self._search_locked(query_trigrams, limit, min_similarity)
+
+    def _search_locked(
+        self,
+        query_trigrams: Set[str],
+        limit: int,
+        min_similarity: float
+    ) -> List[Tuple[str, float]]:
+        query_size = len(query_trigrams)
+        query_ids = {
+            self._trigram_ids[trigram]
+            for trigram in query_trigrams
+            if trigram in self._trigram_ids
+        }
+        postings = sorted(
+            (self._postings[trigram_id] for trigram_id in query_ids if self._postings[trigram_id]),
+            key=len
+        )
+
+        overlap_counts: Counter = Counter()
+        scanned_entries = 0
+        scanned_trigrams = 0
+        for posting in postings:
+            if scanned_entries and scanned_entries + len(posting) > FUZZY_POSTING_BUDGET:
+                break
+            overlap_counts.update(posting)
+            scanned_entries += len(posting)
+            scanned_trigrams += 1
+
+        missing_allowed = (1 - min_similarity) * query_size
+        required_overlap = max(1, math.ceil(scanned_trigrams - missing_allowed))
+
+        matches = []
+        for doc_id, overlap in overlap_counts.most_common(limit * FUZZY_CANDIDATE_FACTOR):
+            if overlap < required_overlap:
+                break
+            isbn = self._isbns[doc_id]
+            if isbn is None:
+                continue
+            document_trigrams = self._document_trigrams(doc_id)
+            shared = len(query_ids.intersection(document_trigrams))
+            containment = shared / query_size
+            if containment < min_similarity:
+                continue
+            jaccard = shared / (query_size + len(document_trigrams) - shared)
+            matches.append((isbn, round((containment + jaccard) / 2, 4), containment))
+
+        matches.sort(key=lambda match: (match[2], match[1]), reverse=True)
+        return [(isbn, similarity) for isbn, similarity, _ in matches[:limit]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            posting_entries = sum(len(posting) for posting in self._postings)
+            posting_bytes = sum(
+                posting.buffer_info()[1] * posting.itemsize
+                for posting in self._postings
+            )
+            memory_bytes = (
+                posting_bytes
+                + sys.getsizeof(self._postings)
+                + sys.getsizeof(self._trigram_ids)
+                + sum(sys.getsizeof(trigram) for trigram in self._trigram_ids)
+                + sys.getsizeof(self._isbns)
+                + self._doc_trigrams.buffer_info()[1] * self._doc_trigrams.itemsize
+                + self._doc_offsets.buffer_info()[1] * self._doc_offsets.itemsize
+                + sys.getsizeof(self._doc_ids)
+                + sum(sys.getsizeof(isbn) for isbn in self._doc_ids)
+            )
+            return {
+                "documents": len(self._doc_ids),
+                "deleted": self._deleted,
+                "trigrams": len(self._trigram_ids),
+                "posting_entries": posting_entries,
+                "posting_bytes": posting_bytes,
+                "memory_bytes": memory_bytes
+            }
+
+
+_indexes_lock = threading.Lock()
+_indexes: Dict[Tuple[str, str], TrigramIndex] = {}
+_build_locks: Dict[str, threading.Lock] = {}
+
+
+def _get_build_lock(branch_id: str) -> threading.Lock:
+    with _indexes_lock:
+        return _build_locks.setdefault(branch_id, threading.Lock())
+
+
+def _build_fuzzy_indexes_locked(branch_id: str) -> Dict[str, TrigramIndex]:
+    field_indexes = {field: TrigramIndex() for field in VALID_SEARCH_FIELDS}
+
+    with closing(get_connection(branch_id)) as connection:
+        cursor = connection.execute(
+            f"SELECT isbn, {', '.join(VALID_SEARCH_FIELDS)} FROM books"
+        )
+        for row in cursor:
+            for field, index in field_indexes.items():
+                index.add(row['isbn'], row[field])
+
+    with _indexes_lock:
+        for field, index in field_indexes.items():
+            _indexes[(branch_id, field)] = index
+    return field_indexes
+
+
+def build_fuzzy_indexes(branch_id: str) -> Dict[str, TrigramIndex]:
+    with _get_build_lock(branch_id):
+        return _build_fuzzy_indexes_locked(branch_id)
+
+
+def get_fuzzy_index(branch_id: str, field: str) -> TrigramIndex:
+    index = _indexes.get((branch_id, field))
+    if index is not None:
+        return index
+
+    with _get_build_lock(branch_id):
+        index = _indexes.get((branch_id, field))
+        if index is None:
+            index = _build_fuzzy_indexes_locked(branch_id)[field]
+    return index
+
+
+def index_book(branch_id: str, isbn: str, title: str, author: str) -> None:
+    values = {"title": title, "author": author}
+    for field in VALID_SEARCH_FIELDS:
+        index = _indexes.get((branch_id, field))
+        if index is not None:
+            index.add(isbn, values[field])
+
+
+def unindex_book(branch_id: str, isbn: str) -> None:
+    for field in VALID_SEARCH_FIELDS:
+        index = _indexes.get((branch_id, field))
+        if index is not None:
+            index.remove(isbn)
+
+
+def get_fuzzy_index_stats() -> Dict[str, Dict[str, Any]]:
+    with _indexes_lock:
+        indexes = dict(_indexes)
+    return {
+        f"{branch_id}:{field}": index.get_stats()
+        for (branch_id, field), index in indexes.items()
+    }
@@ -1,22 +1,26 @@
 import os
-from typing import Dict, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 
 from dotenv import load_dotenv
-from agent import library_agent
+from agent import run_chat_turn, SessionBranchError
 from models import (
-    save_message,
     get_session_messages,
     get_sessions
 )
-from db import get_connection
+from db import get_connection, get_current_branch
+from coalescing import catalog_reads, chat_reads, get_coalescing_stats
+from admission import chat_admission, AdmissionRejected
+from reservations import ensure_reservation_schema, start_reservation_sweeper
+from fuzzy_index import build_fuzzy_indexes, get_fuzzy_index_stats
+from retention import run_retention, get_last_retention_report, start_retention_scheduler
 from contextlib import closing
 from config import (
     DEFAULT_SESSION_ID,
-    CONVERSATION_HISTORY_LIMIT,
     DEFAULT_PORT,
-    DEFAULT_HOST
+    DEFAULT_HOST,
+    BRANCH_IDS
 )
 
 
@@ -39,27 +43,30 @@ def handle_chat() -> tuple[Dict[str, Any], int]:
         request_data = request.json or {}
         message = request_data.get('message', '').strip()
         session_id = request_data.get('session_id', DEFAULT_SESSION_ID)
+        branch_id = request_data.get('branch_id')
         
         if not message:
             return _build_error_response('Message is required', 400)
         
-        previous_messages = get_session_messages(session_id)
-        conversation_history = [
-            {"role": msg['role'], "content": msg['content']}
-            for msg in previous_messages[-CONVERSATION_HISTORY_LIMIT:]
-        ]
+        if branch_id and branch_id not in BRANCH_IDS:
+            return _build_error_response(f'Unknown branch: {branch_id}', 400)
         
-        save_message(session_id, 'user', message)
-        
-        agent_response = library_agent(message, session_id, conversation_history)
-        
-        save_message(session_id, 'assistant', agent_response)
+        with chat_admission.admit(session_id):
+            agent_response = run_chat_turn(message, session_id, branch_id)
         
         return _build_success_response({
             'response': agent_response,
             'session_id': session_id
         })
     
+    except SessionBranchError as error:
+        return _build_error_response(str(error), 400)
+    
+    except AdmissionRejected as rejection:
+        response, status_code = _build_error_response(str(rejection), rejection.status_code)
+        response.headers['Retry-After'] = str(rejection.retry_after_seconds)
+        return response, status_code
+    
     except Exception as error:
         return _build_error_response(str(error), 500)
 
@@ -67,7 +74,7 @@ def handle_chat() -> tuple[Dict[str, Any], int]:
 @app.route('/api/sessions', methods=['GET'])
 def handle_get_sessions() -> Tuple[Dict[str, Any], int]:
     try:
-        sessions = get_sessions()
+        sessions = chat_reads.do(('sessions',), get_sessions)
         return _build_success_response({'sessions': sessions})
     except Exception as error:
         return _build_error_response(str(error), 500)
@@ -76,17 +83,53 @@ def handle_get_sessions() -> Tuple[Dict[str, Any], int]:
 @app.route('/api/sessions/<session_id>/messages', methods=['GET'])
 def handle_get_messages(session_id: str) -> Tuple[Dict[str, Any], int]:
     try:
-        messages = get_session_messages(session_id)
+        messages = chat_reads.do(
+            ('session_messages', session_id),
+            lambda: get_session_messages(session_id)
+        )
         return _build_success_response({'messages': messages})
     except Exception as error:
         return _build_error_response(str(error), 500)
 
 
+@app.route('/api/branches', methods=['GET'])
+def handle_get_branches() -> Tuple[Dict[str, Any], int]:
+    return _build_success_response({'branches': list(BRANCH_IDS)})
+
+
 @app.route('/api/health', methods=['GET'])
 def handle_health_check() -> Tuple[Dict[str, str], int]:
     return _build_success_response({'status': 'ok'})
 
 
+@app.route('/api/stats/coalescing', methods=['GET'])
+def handle_get_coalescing_stats() -> Tuple[Dict[str, Any], int]:
+    return _build_success_response({'coalescing': get_coalescing_stats()})
+
+
+@app.route('/api/stats/admission', methods=['GET'])
+def handle_get_admission_stats() -> Tuple[Dict[str, Any], int]:
+    return _build_success_response({'admission': chat_admission.get_metrics()})
+
+
+@app.route('/api/stats/fuzzy-index', methods=['GET'])
+def handle_get_fuzzy_index_stats() -> Tuple[Dict[str, Any], int]:
+    return _build_success_response({'fuzzy_index': get_fuzzy_index_stats()})
+
+
+@app.route('/api/maintenance/retention', methods=['GET'])
+def handle_get_retention_report() -> Tuple[Dict[str, Any], int]:
+    return _build_success_response({'report': get_last_retention_report()})
+
+
+@app.route('/api/maintenance/retention', methods=['POST'])
+def handle_run_retention() -> Tuple[Dict[str, Any], int]:
+    try:
+        return _build_success_response({'report': run_retention()})
+    except Exception as error:
+        return _build_error_response(str(error), 500)
+
+
 @app.route('/api/orders', methods=['GET'])
 def handle_get_orders() -> Tuple[Dict[str, Any], int]:
     try:
@@ -109,19 +152,26 @@ def handle_get_orders() -> Tuple[Dict[str, Any], int]:
             ORDER BY o.id DESC
         """
         
-        with closing(get_connection()) as connection:
-            cursor = connection.execute(orders_query)
-            orders = [
-                {
-                    'order_id': row['order_id'],
-                    'customer_id': row['customer_id'],
-                    'customer_name': row['customer_name'],
-                    'customer_email': row['customer_email'],
-                    'created_at': row['created_at'],
-                    'items': row['items'] or 'No items'
-                }
-                for row in cursor.fetchall()
-            ]
+        branch_id = request.args.get('branch_id') or get_current_branch()
+        if branch_id not in BRANCH_IDS:
+            return _build_error_response(f'Unknown branch: {branch_id}', 400)
+        
+        def fetch_orders() -> List[Dict[str, Any]]:
+            with closing(get_connection(branch_id)) as connection:
+                cursor = connection.execute(orders_query)
+                return [
+                    {
+                        'order_id': row['order_id'],
+                        'customer_id': row['customer_id'],
+                        'customer_name': row['customer_name'],
+                        'customer_email': row['customer_email'],
+                        'created_at': row['created_at'],
+                        'items': row['items'] or 'No items'
+                    }
+                    for row in cursor.fetchall()
+                ]
+        
+        orders = catalog_reads.do(('orders', branch_id), fetch_orders)
         
         return _build_success_response({'orders': orders})
     except Exception as error:
@@ -147,31 +197,58 @@ def handle_get_order_details(order_id: int) -> Tuple[Dict[str, Any], int]:
             WHERE oi.order_id = ?
         """
         
-        with closing(get_connection()) as connection:
-            cursor = connection.execute(order_header_query, (order_id,))
-            order = cursor.fetchone()
-            
-            if not order:
-                return _build_error_response('Order not found', 404)
-            
-            cursor = connection.execute(order_items_query, (order_id,))
-            items = [dict(row) for row in cursor.fetchall()]
-            
-            total = sum(item['line_total'] for item in items)
-            
-            return _build_success_response({
-                'order_id': order['id'],
-                'customer_id': order['customer_id'],
-                'customer_name': order['customer_name'],
-                'customer_email': order['customer_email'],
-                'created_at': order['created_at'],
-                'items': items,
-                'total': round(total, 2)
-            })
+        branch_id = request.args.get('branch_id') or get_current_branch()
+        if branch_id not in BRANCH_IDS:
+            return _build_error_response(f'Unknown branch: {branch_id}', 400)
+        
+        def fetch_order_details() -> Optional[Dict[str, Any]]:
+            with closing(get_connection(branch_id)) as connection:
+                cursor = connection.execute(order_header_query, (order_id,))
+                order = cursor.fetchone()
+                
+                if not order:
+                    return None
+                
+                cursor = connection.execute(order_items_query, (order_id,))
+                items = [dict(row) for row in cursor.fetchall()]
+                
+                total = sum(item['line_total'] for item in items)
+                
+                return {
+                    'order_id': order['id'],
+                    'customer_id': order['customer_id'],
+                    'customer_name': order['customer_name'],
+                    'customer_email': order['customer_email'],
+                    'created_at': order['created_at'],
+                    'items': items,
+                    'total': round(total, 2)
+                }
+        
+        order_details = catalog_reads.do(('order_details', order_id, branch_id), fetch_order_details)
+        
+        if not order_details:
+            return _build_error_response('Order not found', 404)
+        
+        return _build_success_response(order_details)
     except Exception as error:
         return _build_error_response(str(error), 500)
 
 
+def _start_background_work() -> None:
+    for branch_id in BRANCH_IDS:
+        ensure_reservation_schema(branch_id)
+        build_fuzzy_indexes(branch_id)
+    start_retention_scheduler()
+    start_reservation_sweeper()
+
+
+def _is_serving_process(use_reloader: bool) -> bool:
+    return not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', DEFAULT_PORT))
-    app.run(host=DEFAULT_HOST, port=port, debug=True)
+    debug = True
+    if _is_serving_process(use_reloader=debug):
+        _start_background_work()
+    app.run(host=DEFAULT_HOST, port=port, debug=debug)
@@ -1,16 +1,80 @@
 import json
-from typing import List, Dict, Any, Optional
+import sqlite3
+import threading
+import zlib
+from typing import List, Dict, Any, Optional, Tuple, Union
 from contextlib import closing
 from db import get_connection
+from coalescing import chat_reads
+from config import (
+    PAYLOAD_COMPRESSION_THRESHOLD,
+    PAYLOAD_COMPRESSION_LEVEL,
+    DEFAULT_BRANCH_ID,
+    ARCHIVE_DATABASE_PATH
+)
+
+
+COMPRESSED_PAYLOAD_PREFIX = b"zlib:"
+
+_SESSION_BRANCH_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS session_branches (
+        session_id TEXT PRIMARY KEY,
+        branch_id TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+_session_branch_schema_lock = threading.Lock()
+_session_branch_schema_ready = False
+
+
+def encode_payload(payload_json: str) -> Union[str, bytes]:
+    if len(payload_json) < PAYLOAD_COMPRESSION_THRESHOLD:
+        return payload_json
+    compressed = zlib.compress(payload_json.encode("utf-8"), PAYLOAD_COMPRESSION_LEVEL)
+    return COMPRESSED_PAYLOAD_PREFIX + compressed
+
+
+def decode_payload(stored_value: Union[str, bytes]) -> str:
+    if isinstance(stored_value, bytes) and stored_value.startswith(COMPRESSED_PAYLOAD_PREFIX):
+        compressed = stored_value[len(COMPRESSED_PAYLOAD_PREFIX):]
+        return zlib.decompress(compressed).decode("utf-8")
+    if isinstance(stored_value, bytes):
+        return stored_value.decode("utf-8")
+    return stored_value
+
+
+def decode_tool_call_row(row: Any) -> Dict[str, Any]:
+    tool_call = dict(row)
+    tool_call['args_json'] = decode_payload(tool_call['args_json'])
+    tool_call['result_json'] = decode_payload(tool_call['result_json'])
+    return tool_call
+
+
+def get_archive_connection() -> sqlite3.Connection:
+    archive_uri = f"{ARCHIVE_DATABASE_PATH.as_uri()}?mode=ro"
+    connection = sqlite3.connect(archive_uri, uri=True)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def _query_archive(query: str, params: Tuple[Any, ...] = ()) -> List[sqlite3.Row]:
+    if not ARCHIVE_DATABASE_PATH.exists():
+        return []
+    
+    with closing(get_archive_connection()) as connection:
+        return connection.execute(query, params).fetchall()
 
 
 def save_message(session_id: str, role: str, content: str) -> None:
-    with closing(get_connection()) as connection:
+    with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
         connection.execute(
             "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
             (session_id, role, content)
         )
         connection.commit()
+    
+    chat_reads.invalidate()
 
 
 def save_tool_call(
@@ -19,10 +83,15 @@ def save_tool_call(
     arguments: Dict[str, Any],
     result: Dict[str, Any]
 ) -> None:
-    with closing(get_connection()) as connection:
+    with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
         connection.execute(
             "INSERT INTO tool_calls (session_id, name, args_json, result_json) VALUES (?, ?, ?, ?)",
-            (session_id, tool_name, json.dumps(arguments), json.dumps(result))
+            (
+                session_id,
+                tool_name,
+                encode_payload(json.dumps(arguments)),
+                encode_payload(json.dumps(result))
+            )
         )
         connection.commit()
 
@@ -34,37 +103,101 @@ def get_session_messages(session_id: str) -> List[Dict[str, Any]]:
         WHERE session_id = ? 
         ORDER BY created_at ASC
     """
+    archive_query = """
+        SELECT source_id AS id, role, content, created_at 
+        FROM messages 
+        WHERE session_id = ? 
+        ORDER BY created_at ASC, source_id ASC
+    """
     
-    with closing(get_connection()) as connection:
+    archived_rows = _query_archive(archive_query, (session_id,))
+    
+    with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
         cursor = connection.execute(query, (session_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        return [dict(row) for row in archived_rows + cursor.fetchall()]
 
 
 def get_sessions() -> List[str]:
     query = "SELECT DISTINCT session_id FROM messages ORDER BY session_id"
     
-    with closing(get_connection()) as connection:
+    archived_sessions = {row['session_id'] for row in _query_archive(query)}
+    
+    with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
         cursor = connection.execute(query)
-        return [row['session_id'] for row in cursor.fetchall()]
+        active_sessions = {row['session_id'] for row in cursor.fetchall()}
+    
+    return sorted(archived_sessions | active_sessions)
+
+
+def ensure_session_branch_schema() -> None:
+    global _session_branch_schema_ready
+    if _session_branch_schema_ready:
+        return
+
+    with _session_branch_schema_lock:
+        if _session_branch_schema_ready:
+            return
+        with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
+            connection.execute(_SESSION_BRANCH_SCHEMA)
+            connection.commit()
+        _session_branch_schema_ready = True
+
+
+def save_session_branch(session_id: str, branch_id: str) -> None:
+    ensure_session_branch_schema()
+    
+    with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
+        connection.execute(
+            """
+            INSERT INTO session_branches (session_id, branch_id) VALUES (?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                branch_id = excluded.branch_id,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (session_id, branch_id)
+        )
+        connection.commit()
+
+
+def get_session_branch(session_id: str) -> Optional[str]:
+    ensure_session_branch_schema()
+    
+    with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
+        row = connection.execute(
+            "SELECT branch_id FROM session_branches WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+    
+    if row is None:
+        archived_rows = _query_archive(
+            "SELECT branch_id FROM session_branches WHERE session_id = ?",
+            (session_id,)
+        )
+        row = archived_rows[0] if archived_rows else None
+    
+    return row['branch_id'] if row else None
 
 
 def get_tool_calls(session_id: Optional[str] = None) -> List[Dict[str, Any]]:
-    if session_id:
-        query = """
-            SELECT id, session_id, name, args_json, result_json, created_at 
-            FROM tool_calls 
-            WHERE session_id = ? 
-            ORDER BY created_at ASC
-        """
-        params = (session_id,)
-    else:
-        query = """
-            SELECT id, session_id, name, args_json, result_json, created_at 
-            FROM tool_calls 
-            ORDER BY created_at ASC
-        """
-        params = ()
+    columns = "session_id, name, args_json, result_json, created_at"
+    session_filter = "WHERE session_id = ?" if session_id else ""
+    params = (session_id,) if session_id else ()
+    
+    query = f"""
+        SELECT id, {columns} 
+        FROM tool_calls 
+        {session_filter} 
+        ORDER BY created_at ASC
+    """
+    archive_query = f"""
+        SELECT source_id AS id, {columns} 
+        FROM tool_calls 
+        {session_filter} 
+        ORDER BY created_at ASC, source_id ASC
+    """
+    
+    archived_rows = _query_archive(archive_query, params)
     
-    with closing(get_connection()) as connection:
+    with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
         cursor = connection.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        return [decode_tool_call_row(row) for row in archived_rows + cursor.fetchall()]
@@ -0,0 +1,258 @@
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, List, Any, Optional, Set
+
+from db import get_connection, get_database_path
+from coalescing import catalog_reads
+from config import (
+    BRANCH_IDS,
+    RESERVATION_TTL_SECONDS,
+    RESERVATION_SWEEP_INTERVAL_SECONDS,
+    STOCK_CAS_MAX_RETRIES,
+    STOCK_CAS_BACKOFF_SECONDS
+)
+
+
+STATUS_HELD = "held"
+STATUS_CONSUMED = "consumed"
+STATUS_RELEASED = "released"
+STATUS_EXPIRED = "expired"
+
+_RESERVATION_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reservations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        isbn TEXT NOT NULL,
+        qty INTEGER NOT NULL,
+        session_id TEXT,
+        status TEXT NOT NULL DEFAULT 'held',
+        expires_at TIMESTAMP NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (isbn) REFERENCES books(isbn)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_reservations_status_expires
+        ON reservations (status, expires_at);
+"""
+
+_schema_lock = threading.Lock()
+_migrated_paths: Set[str] = set()
+_sweeper_lock = threading.Lock()
+_sweeper_thread: Optional[threading.Thread] = None
+
+
+class StockUnavailableError(ValueError):
+    pass
+
+
+class StockContentionError(ValueError):
+    pass
+
+
+def ensure_reservation_schema(branch_id: Optional[str] = None) -> None:
+    database_path = str(get_database_path(branch_id))
+    if database_path in _migrated_paths:
+        return
+
+    with _schema_lock:
+        if database_path in _migrated_paths:
+            return
+
+        with closing(get_connection(branch_id)) as connection:
+            book_columns = {
+                row['name'] for row in connection.execute("PRAGMA table_info(books)")
+            }
+            if "version" not in book_columns:
+                connection.execute(
+                    "ALTER TABLE books ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+                )
+            connection.executescript(_RESERVATION_SCHEMA)
+            connection.commit()
+
+        _migrated_paths.add(database_path)
+
+
+def _backoff(attempt: int) -> None:
+    time.sleep(random.uniform(0, STOCK_CAS_BACKOFF_SECONDS * (2 ** min(attempt, 6))))
+
+
+def _hold_stock(
+    connection: sqlite3.Connection,
+    isbn: str,
+    quantity: int,
+    session_id: Optional[str],
+    ttl_seconds: int
+) -> Optional[int]:
+    book = connection.execute(
+        "SELECT stock, version FROM books WHERE isbn = ?",
+        (isbn,)
+    ).fetchone()
+
+    if not book:
+        raise ValueError(f"Book not found: {isbn}")
+    if book['stock'] < quantity:
+        raise StockUnavailableError(
+            f"Insufficient stock for {isbn}: requested {quantity}, available {book['stock']}"
+        )
+
+    try:
+        cursor = connection.execute(
+            "UPDATE books SET stock = stock - ?, version = version + 1 "
+            "WHERE isbn = ? AND version = ?",
+            (quantity, isbn, book['version'])
+        )
+        if cursor.rowcount != 1:
+            connection.rollback()
+            return None
+
+        cursor = connection.execute(
+            "INSERT INTO reservations (isbn, qty, session_id, status, expires_at) "
+            "VALUES (?, ?, ?, ?, datetime('now', ?))",
+            (isbn, quantity, session_id, STATUS_HELD, f"+{int(ttl_seconds)} seconds")
+        )
+        connection.commit()
+        return cursor.lastrowid
+    except sqlite3.OperationalError as error:
+        connection.rollback()
+        if "locked" not in str(error):
+            raise
+        return None
+
+
+def reserve_stock(
+    isbn: str,
+    quantity: int,
+    session_id: Optional[str] = None,
+    ttl_seconds: int = RESERVATION_TTL_SECONDS
+) -> Dict[str, Any]:
+    if quantity <= 0:
+        raise ValueError("Quantity must be positive")
+
+    ensure_reservation_schema()
+
+    with closing(get_connection()) as connection:
+        for attempt in range(STOCK_CAS_MAX_RETRIES):
+            reservation_id = _hold_stock(connection, isbn, quantity, session_id, ttl_seconds)
+            if reservation_id is not None:
+                catalog_reads.invalidate()
+                return {
+                    "reservation_id": reservation_id,
+                    "isbn": isbn,
+                    "qty": quantity,
+                    "status": STATUS_HELD
+                }
+            _backoff(attempt)
+
+    raise StockContentionError(
+        f"Could not reserve {isbn} after {STOCK_CAS_MAX_RETRIES} attempts, please retry"
+    )
+
+
+def _return_held_stock(
+    connection: sqlite3.Connection,
+    reservation_ids: List[int],
+    new_status: str
+) -> int:
+    returned = 0
+    for reservation_id in reservation_ids:
+        reservation = connection.execute(
+            "SELECT isbn, qty FROM reservations WHERE id = ? AND status = ?",
+            (reservation_id, STATUS_HELD)
+        ).fetchone()
+        if not reservation:
+            continue
+
+        cursor = connection.execute(
+            "UPDATE reservations SET status = ? WHERE id = ? AND status = ?",
+            (new_status, reservation_id, STATUS_HELD)
+        )
+        if cursor.rowcount != 1:
+            continue
+
+        connection.execute(
+            "UPDATE books SET stock = stock + ?, version = version + 1 WHERE isbn = ?",
+            (reservation['qty'], reservation['isbn'])
+        )
+        returned += 1
+
+    return returned
+
+
+def release_reservations(reservation_ids: List[int]) -> int:
+    if not reservation_ids:
+        return 0
+
+    ensure_reservation_schema()
+
+    with closing(get_connection()) as connection:
+        released = _return_held_stock(connection, reservation_ids, STATUS_RELEASED)
+        connection.commit()
+
+    if released:
+        catalog_reads.invalidate()
+    return released
+
+
+def consume_reservations(connection: sqlite3.Connection, reservation_ids: List[int]) -> None:
+    placeholders = ", ".join("?" for _ in reservation_ids)
+    cursor = connection.execute(
+        f"UPDATE reservations SET status = ? "
+        f"WHERE id IN ({placeholders}) AND status = ? AND expires_at > datetime('now')",
+        (STATUS_CONSUMED, *reservation_ids, STATUS_HELD)
+    )
+    if cursor.rowcount != len(reservation_ids):
+        raise StockUnavailableError("Stock reservation expired before the order was placed")
+
+
+def sweep_expired_reservations(branch_id: Optional[str] = None) -> int:
+    ensure_reservation_schema(branch_id)
+
+    with closing(get_connection(branch_id)) as connection:
+        expired_ids = [
+            row['id'] for row in connection.execute(
+                "SELECT id FROM reservations WHERE status = ? AND expires_at <= datetime('now')",
+                (STATUS_HELD,)
+            ).fetchall()
+        ]
+        if not expired_ids:
+            return 0
+
+        expired = _return_held_stock(connection, expired_ids, STATUS_EXPIRED)
+        connection.commit()
+
+    if expired:
+        catalog_reads.invalidate()
+    return expired
+
+
+def _sweeper_loop(interval_seconds: int) -> None:
+    while True:
+        time.sleep(interval_seconds)
+        for branch_id in BRANCH_IDS:
+            try:
+                expired = sweep_expired_reservations(branch_id)
+                if expired:
+                    print(f"Reservations: released {expired} expired holds on branch {branch_id}")
+            except Exception as error:
+                print(f"Warning: Reservation sweep failed on branch {branch_id}: {error}")
+
+
+def start_reservation_sweeper(
+    interval_seconds: int = RESERVATION_SWEEP_INTERVAL_SECONDS
+) -> bool:
+    global _sweeper_thread
+
+    with _sweeper_lock:
+        if _sweeper_thread is not None and _sweeper_thread.is_alive():
+            return False
+
+        _sweeper_thread = threading.Thread(
+            target=_sweeper_loop,
+            args=(interval_seconds,),
+            name="reservation-sweeper",
+            daemon=True
+        )
+        _sweeper_thread.start()
+        return True
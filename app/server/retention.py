@@ -0,0 +1,326 @@
+import argparse
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from statistics import median
+from typing import Dict, Any, Optional
+
+from db import get_connection
+from coalescing import chat_reads
+from models import encode_payload, decode_payload, ensure_session_branch_schema
+from config import (
+    ARCHIVE_DATABASE_PATH,
+    DEFAULT_BRANCH_ID,
+    PAYLOAD_COMPRESSION_THRESHOLD,
+    RETENTION_MAX_AGE_DAYS,
+    RETENTION_INTERVAL_SECONDS,
+    RETENTION_BATCH_SIZE,
+    INCREMENTAL_VACUUM_PAGES,
+    RETENTION_PROBE_RUNS
+)
+
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+_ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS archive.messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_id INTEGER NOT NULL,
+        session_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS archive.tool_calls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_id INTEGER NOT NULL,
+        session_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        args_json TEXT NOT NULL,
+        result_json TEXT NOT NULL,
+        created_at TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS archive.session_branches (
+        session_id TEXT PRIMARY KEY,
+        branch_id TEXT NOT NULL,
+        updated_at TIMESTAMP
+    );
+
+    CREATE INDEX IF NOT EXISTS archive.idx_archive_messages_session
+        ON messages (session_id);
+
+    CREATE INDEX IF NOT EXISTS archive.idx_archive_tool_calls_session
+        ON tool_calls (session_id);
+"""
+
+_PROBE_QUERIES = (
+    "SELECT id, session_id, name, args_json, result_json, created_at "
+    "FROM tool_calls ORDER BY created_at DESC LIMIT 100",
+    "SELECT id, session_id, role, content, created_at "
+    "FROM messages ORDER BY created_at DESC LIMIT 100"
+)
+
+_scheduler_lock = threading.Lock()
+_scheduler_thread: Optional[threading.Thread] = None
+_last_report: Optional[Dict[str, Any]] = None
+
+
+def _get_storage_stats(connection: sqlite3.Connection) -> Dict[str, int]:
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    return {
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_count": freelist_count,
+        "file_bytes": page_size * page_count,
+        "free_bytes": page_size * freelist_count
+    }
+
+
+def _measure_probe_latency_ms(connection: sqlite3.Connection) -> float:
+    timings = []
+    for _ in range(RETENTION_PROBE_RUNS):
+        started = time.perf_counter()
+        for probe_query in _PROBE_QUERIES:
+            connection.execute(probe_query).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(median(timings), 3)
+
+
+def is_incremental_vacuum_enabled(connection: sqlite3.Connection) -> bool:
+    return connection.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+
+
+def ensure_incremental_vacuum(connection: sqlite3.Connection) -> bool:
+    if is_incremental_vacuum_enabled(connection):
+        return False
+
+    connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    connection.execute("VACUUM")
+    return True
+
+
+def compact_tool_calls(connection: sqlite3.Connection) -> int:
+    compacted = 0
+    last_id = 0
+
+    while True:
+        rows = connection.execute(
+            """
+            SELECT id, args_json, result_json
+            FROM tool_calls
+            WHERE id > ?
+              AND (
+                  (typeof(args_json) = 'text' AND length(args_json) >= ?)
+                  OR (typeof(result_json) = 'text' AND length(result_json) >= ?)
+              )
+            ORDER BY id
+            LIMIT ?
+            """,
+            (
+                last_id,
+                PAYLOAD_COMPRESSION_THRESHOLD,
+                PAYLOAD_COMPRESSION_THRESHOLD,
+                RETENTION_BATCH_SIZE
+            )
+        ).fetchall()
+
+        if not rows:
+            break
+
+        updates = [
+            (
+                encode_payload(decode_payload(row['args_json'])),
+                encode_payload(decode_payload(row['result_json'])),
+                row['id']
+            )
+            for row in rows
+        ]
+
+        connection.executemany(
+            "UPDATE tool_calls SET args_json = ?, result_json = ? WHERE id = ?",
+            updates
+        )
+        connection.commit()
+        compacted += len(updates)
+
+        last_id = rows[-1]['id']
+
+    return compacted
+
+
+def archive_old_sessions(
+    connection: sqlite3.Connection,
+    max_age_days: int = RETENTION_MAX_AGE_DAYS
+) -> Dict[str, int]:
+    ensure_session_branch_schema()
+    connection.execute(
+        "ATTACH DATABASE ? AS archive",
+        (str(ARCHIVE_DATABASE_PATH),)
+    )
+
+    try:
+        connection.executescript(_ARCHIVE_SCHEMA)
+        connection.execute("DROP TABLE IF EXISTS temp.stale_sessions")
+        connection.execute(
+            """
+            CREATE TEMP TABLE stale_sessions AS
+            SELECT session_id
+            FROM (
+                SELECT session_id, created_at FROM main.messages
+                UNION ALL
+                SELECT session_id, created_at FROM main.tool_calls
+            )
+            GROUP BY session_id
+            HAVING MAX(created_at) < datetime('now', ?)
+            """,
+            (f"-{max_age_days} days",)
+        )
+
+        stale_filter = "session_id IN (SELECT session_id FROM temp.stale_sessions)"
+
+        with connection:
+            connection.execute(
+                f"INSERT INTO archive.messages "
+                f"(source_id, session_id, role, content, created_at) "
+                f"SELECT id, session_id, role, content, created_at "
+                f"FROM main.messages WHERE {stale_filter}"
+            )
+            connection.execute(
+                f"INSERT INTO archive.tool_calls "
+                f"(source_id, session_id, name, args_json, result_json, created_at) "
+                f"SELECT id, session_id, name, args_json, result_json, created_at "
+                f"FROM main.tool_calls WHERE {stale_filter}"
+            )
+            connection.execute(
+                f"INSERT OR REPLACE INTO archive.session_branches "
+                f"SELECT session_id, branch_id, updated_at "
+                f"FROM main.session_branches WHERE {stale_filter}"
+            )
+            sessions = connection.execute(
+                "SELECT COUNT(*) FROM temp.stale_sessions"
+            ).fetchone()[0]
+            messages = connection.execute(
+                f"DELETE FROM main.messages WHERE {stale_filter}"
+            ).rowcount
+            tool_calls = connection.execute(
+                f"DELETE FROM main.tool_calls WHERE {stale_filter}"
+            ).rowcount
+            connection.execute(f"DELETE FROM main.session_branches WHERE {stale_filter}")
+
+        connection.execute("DROP TABLE temp.stale_sessions")
+    finally:
+        connection.execute("DETACH DATABASE archive")
+
+    return {
+        "sessions": sessions,
+        "messages": messages,
+        "tool_calls": tool_calls
+    }
+
+
+def run_incremental_vacuum(
+    connection: sqlite3.Connection,
+    max_pages: int = INCREMENTAL_VACUUM_PAGES
+) -> None:
+    connection.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+
+
+def run_retention(max_age_days: int = RETENTION_MAX_AGE_DAYS) -> Dict[str, Any]:
+    global _last_report
+    started = time.perf_counter()
+
+    with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
+        storage_before = _get_storage_stats(connection)
+        latency_before_ms = _measure_probe_latency_ms(connection)
+
+        incremental_vacuum = is_incremental_vacuum_enabled(connection)
+        compacted = compact_tool_calls(connection)
+        archived = archive_old_sessions(connection, max_age_days)
+        if archived["sessions"]:
+            chat_reads.invalidate()
+        if incremental_vacuum:
+            run_incremental_vacuum(connection)
+
+        storage_after = _get_storage_stats(connection)
+        latency_after_ms = _measure_probe_latency_ms(connection)
+
+    report = {
+        "ran_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        "incremental_vacuum": incremental_vacuum,
+        "compacted_tool_calls": compacted,
+        "archived": archived,
+        "bytes_before": storage_before["file_bytes"],
+        "bytes_after": storage_after["file_bytes"],
+        "reclaimed_bytes": storage_before["file_bytes"] - storage_after["file_bytes"],
+        "free_bytes_remaining": storage_after["free_bytes"],
+        "probe_latency_before_ms": latency_before_ms,
+        "probe_latency_after_ms": latency_after_ms
+    }
+
+    _last_report = report
+    return report
+
+
+def get_last_retention_report() -> Optional[Dict[str, Any]]:
+    return _last_report
+
+
+def _retention_loop(interval_seconds: int) -> None:
+    while True:
+        time.sleep(interval_seconds)
+        try:
+            report = run_retention()
+            print(
+                f"Retention: archived {report['archived']['sessions']} sessions, "
+                f"reclaimed {report['reclaimed_bytes']} bytes, "
+                f"probe latency {report['probe_latency_before_ms']}ms -> "
+                f"{report['probe_latency_after_ms']}ms"
+            )
+        except Exception as error:
+            print(f"Warning: Retention run failed: {error}")
+
+
+def start_retention_scheduler(interval_seconds: int = RETENTION_INTERVAL_SECONDS) -> bool:
+    global _scheduler_thread
+
+    with _scheduler_lock:
+        if _scheduler_thread is not None and _scheduler_thread.is_alive():
+            return False
+
+        _scheduler_thread = threading.Thread(
+            target=_retention_loop,
+            args=(interval_seconds,),
+            name="retention-scheduler",
+            daemon=True
+        )
+        _scheduler_thread.start()
+        return True
+
+
+def enable_incremental_vacuum() -> bool:
+    with closing(get_connection(DEFAULT_BRANCH_ID)) as connection:
+        return ensure_incremental_vacuum(connection)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run audit log retention on the main database")
+    parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="Convert an existing database to incremental auto-vacuum (runs a full VACUUM)"
+    )
+    args = parser.parse_args()
+
+    if args.enable_incremental_vacuum:
+        if enable_incremental_vacuum():
+            print("Converted database to incremental auto-vacuum")
+        else:
+            print("Incremental auto-vacuum already enabled")
+    else:
+        print(run_retention())
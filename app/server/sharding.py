@@ -0,0 +1,58 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Callable, Dict, List, Any, Optional, Sequence
+
+from db import get_connection
+from config import BRANCH_IDS, FAN_OUT_MAX_WORKERS
+
+
+ShardQuery = Callable[[sqlite3.Connection], List[Dict[str, Any]]]
+BranchQuery = Callable[[str], List[Dict[str, Any]]]
+
+_executor = ThreadPoolExecutor(
+    max_workers=FAN_OUT_MAX_WORKERS,
+    thread_name_prefix="shard-fan-out"
+)
+
+
+def _query_shard(branch_id: str, query: ShardQuery) -> List[Dict[str, Any]]:
+    with closing(get_connection(branch_id)) as connection:
+        return [
+            {**row, "branch_id": branch_id}
+            for row in query(connection)
+        ]
+
+
+def fan_out(
+    query: ShardQuery,
+    branch_ids: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    return fan_out_branches(lambda branch_id: _query_shard(branch_id, query), branch_ids)
+
+
+def fan_out_branches(
+    query: BranchQuery,
+    branch_ids: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    branches = list(branch_ids or BRANCH_IDS)
+
+    if len(branches) == 1:
+        return query(branches[0])
+
+    futures = [
+        _executor.submit(query, branch_id)
+        for branch_id in branches
+    ]
+
+    merged_rows: List[Dict[str, Any]] = []
+    failures: List[str] = []
+    for branch_id, future in zip(branches, futures):
+        try:
+            merged_rows.extend(future.result())
+        except Exception as error:
+            failures.append(f"{branch_id}: {error}")
+
+    if failures:
+        raise RuntimeError(f"Branch query failed on {'; '.join(failures)}")
+    return merged_rows
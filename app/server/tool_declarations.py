@@ -7,7 +7,10 @@ def create_find_books_declaration() -> types.FunctionDeclaration:
         name="find_books",
         description=(
             "Find books by title or author. Returns a list of matching books "
-            "with ISBN, title, author, price, and stock."
+            "with ISBN, title, author, price, and stock. If nothing contains the "
+            "query, the closest spellings are returned with a similarity score. "
+            "Set all_branches to search every library branch; each result then "
+            "includes its branch_id."
         ),
         parameters=types.Schema(
             type="OBJECT",
@@ -20,6 +23,10 @@ def create_find_books_declaration() -> types.FunctionDeclaration:
                     type="STRING",
                     description="Search by 'title' or 'author'",
                     enum=["title", "author"]
+                ),
+                "all_branches": types.Schema(
+                    type="BOOLEAN",
+                    description="Search all library branches instead of the session's branch"
                 )
             },
             required=["q", "by"]
@@ -135,11 +142,17 @@ def create_inventory_summary_declaration() -> types.FunctionDeclaration:
         name="inventory_summary",
         description=(
             "List all books with low stock (stock < 5). "
-            "Returns list of books with title and stock."
+            "Returns list of books with title and stock. Set all_branches to "
+            "cover every library branch; each result then includes its branch_id."
         ),
         parameters=types.Schema(
             type="OBJECT",
-            properties={},
+            properties={
+                "all_branches": types.Schema(
+                    type="BOOLEAN",
+                    description="Summarize all library branches instead of the session's branch"
+                )
+            },
             required=[]
         )
     )
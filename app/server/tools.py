@@ -1,83 +1,158 @@
+import sqlite3
+from contextlib import closing
 from typing import List, Dict, Any, Optional, Union
 from langchain.tools import tool
-from db import get_connection
+from db import get_connection, get_current_branch
+from sharding import fan_out, fan_out_branches
+from fuzzy_index import get_fuzzy_index
+from coalescing import catalog_reads
+from reservations import (
+    ensure_reservation_schema,
+    reserve_stock,
+    release_reservations,
+    consume_reservations
+)
 from config import VALID_SEARCH_FIELDS, LOW_STOCK_THRESHOLD
 
 
+def _query_books(connection: sqlite3.Connection, q: str, by: str) -> List[Dict[str, Any]]:
+    search_query = f"%{q}%"
+    select_fields = "isbn, title, author, price, stock"
+    sql_query = f"SELECT {select_fields} FROM books WHERE {by} LIKE ?"
+    cursor = connection.execute(sql_query, (search_query,))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def _query_low_stock(connection: sqlite3.Connection) -> List[Dict[str, Any]]:
+    cursor = connection.execute(
+        "SELECT title, stock FROM books WHERE stock < ?",
+        (LOW_STOCK_THRESHOLD,)
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def _query_fuzzy_books(branch_id: str, q: str, by: str) -> List[Dict[str, Any]]:
+    matches = get_fuzzy_index(branch_id, by).search(q)
+    if not matches:
+        return []
+    
+    similarities = dict(matches)
+    placeholders = ", ".join("?" for _ in matches)
+    
+    with closing(get_connection(branch_id)) as connection:
+        cursor = connection.execute(
+            f"SELECT isbn, title, author, price, stock FROM books WHERE isbn IN ({placeholders})",
+            list(similarities)
+        )
+        books = [
+            {**dict(row), "similarity": similarities[row['isbn']]}
+            for row in cursor.fetchall()
+        ]
+    
+    return sorted(books, key=lambda book: book["similarity"], reverse=True)
+
+
+def _branch_scope(all_branches: bool) -> str:
+    return "*" if all_branches else get_current_branch()
+
+
 @tool
-def find_books(q: str, by: str) -> List[Dict[str, Any]]:
+def find_books(q: str, by: str, all_branches: bool = False) -> List[Dict[str, Any]]:
+    """Find books by title or author, falling back to the closest spellings."""
     if by not in VALID_SEARCH_FIELDS:
         return []
     
-    search_query = f"%{q}%"
-    select_fields = "isbn, title, author, price, stock"
+    def run_query() -> List[Dict[str, Any]]:
+        if all_branches:
+            books = fan_out(lambda connection: _query_books(connection, q, by))
+        else:
+            with get_connection() as connection:
+                books = _query_books(connection, q, by)
+        
+        if books:
+            return books
+        
+        if all_branches:
+            return fan_out_branches(lambda branch_id: [
+                {**book, "branch_id": branch_id}
+                for book in _query_fuzzy_books(branch_id, q, by)
+            ])
+        return _query_fuzzy_books(get_current_branch(), q, by)
     
-    with get_connection() as connection:
-        sql_query = f"SELECT {select_fields} FROM books WHERE {by} LIKE ?"
-        cursor = connection.execute(sql_query, (search_query,))
-        return [dict(row) for row in cursor.fetchall()]
+    return catalog_reads.do(("find_books", q, by, _branch_scope(all_branches)), run_query)
 
 
 @tool
 def create_order(customer_id: int, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create a new order for a customer and reduce book stock."""
     if not items:
         raise ValueError("Order must contain at least one item")
     
-    with get_connection() as connection:
-        cursor = connection.cursor()
+    for item in items:
+        if not item.get("isbn") or not item.get("qty") or item["qty"] <= 0:
+            raise ValueError(f"Invalid item: {item}")
+    
+    reservation_ids: List[int] = []
+    
+    try:
+        for item in items:
+            reservation = reserve_stock(item["isbn"], item["qty"])
+            reservation_ids.append(reservation["reservation_id"])
         
-        try:
-            cursor.execute(
-                "INSERT INTO orders (customer_id) VALUES (?)",
-                (customer_id,)
-            )
-            order_id = cursor.lastrowid
+        with closing(get_connection()) as connection:
+            cursor = connection.cursor()
             
-            for item in items:
-                isbn = item.get("isbn")
-                quantity = item.get("qty")
-                
-                if not isbn or quantity is None:
-                    raise ValueError(f"Invalid item: {item}")
-                
+            try:
                 cursor.execute(
-                    "INSERT INTO order_items (order_id, isbn, qty) VALUES (?, ?, ?)",
-                    (order_id, isbn, quantity)
+                    "INSERT INTO orders (customer_id) VALUES (?)",
+                    (customer_id,)
                 )
+                order_id = cursor.lastrowid
                 
-                cursor.execute(
-                    "UPDATE books SET stock = stock - ? WHERE isbn = ?",
-                    (quantity, isbn)
+                cursor.executemany(
+                    "INSERT INTO order_items (order_id, isbn, qty) VALUES (?, ?, ?)",
+                    [(order_id, item["isbn"], item["qty"]) for item in items]
                 )
-            
-            connection.commit()
-            
-            return {
-                "order_id": order_id,
-                "status": "created"
-            }
-        except Exception as error:
-            connection.rollback()
-            raise ValueError(f"Failed to create order: {str(error)}") from error
+                
+                consume_reservations(connection, reservation_ids)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        
+        catalog_reads.invalidate()
+        
+        return {
+            "order_id": order_id,
+            "status": "created"
+        }
+    except Exception as error:
+        release_reservations(reservation_ids)
+        raise ValueError(f"Failed to create order: {str(error)}") from error
 
 
 @tool
 def restock_book(isbn: str, quantity: int) -> Dict[str, Any]:
+    """Increase book stock by a specified quantity."""
     if quantity <= 0:
         raise ValueError("Quantity must be positive")
     
-    with get_connection() as connection:
+    ensure_reservation_schema()
+    
+    with closing(get_connection()) as connection:
         connection.execute(
-            "UPDATE books SET stock = stock + ? WHERE isbn = ?",
+            "UPDATE books SET stock = stock + ?, version = version + 1 WHERE isbn = ?",
             (quantity, isbn)
         )
         connection.commit()
     
+    catalog_reads.invalidate()
     return {"isbn": isbn, "added": quantity}
 
 
 @tool
 def update_price(isbn: str, price: float) -> Dict[str, Any]:
+    """Update the price of a book."""
     if price <= 0:
         raise ValueError("Price must be positive")
     
@@ -88,11 +163,13 @@ def update_price(isbn: str, price: float) -> Dict[str, Any]:
         )
         connection.commit()
     
+    catalog_reads.invalidate()
     return {"isbn": isbn, "new_price": price}
 
 
 @tool
 def order_status(order_id: int) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+    """Get order details including customer name, book titles, and quantities."""
     order_query = """
         SELECT o.id AS order_id,
                c.name AS customer,
@@ -105,21 +182,27 @@ def order_status(order_id: int) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
         WHERE o.id = ?
     """
     
-    with get_connection() as connection:
-        cursor = connection.execute(order_query, (order_id,))
-        rows = cursor.fetchall()
+    def run_query() -> List[Dict[str, Any]]:
+        with get_connection() as connection:
+            cursor = connection.execute(order_query, (order_id,))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    rows = catalog_reads.do(("order_status", order_id, get_current_branch()), run_query)
     
     if not rows:
         return {"error": "Order not found"}
     
-    return [dict(row) for row in rows]
+    return rows
 
 
 @tool
-def inventory_summary() -> List[Dict[str, Any]]:
-    with get_connection() as connection:
-        cursor = connection.execute(
-            "SELECT title, stock FROM books WHERE stock < ?",
-            (LOW_STOCK_THRESHOLD,)
-        )
-        return [dict(row) for row in cursor.fetchall()]
+def inventory_summary(all_branches: bool = False) -> List[Dict[str, Any]]:
+    """List all books with low stock."""
+    def run_query() -> List[Dict[str, Any]]:
+        if all_branches:
+            return fan_out(_query_low_stock)
+        
+        with get_connection() as connection:
+            return _query_low_stock(connection)
+    
+    return catalog_reads.do(("inventory_summary", _branch_scope(all_branches)), run_query)
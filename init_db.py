@@ -1,42 +1,75 @@
+import argparse
 import sqlite3
 import os
 
+from app.server.config import BRANCH_DATABASE_PATHS, BRANCH_IDS, DEFAULT_BRANCH_ID
+
 DB_DIR = os.path.join(os.path.dirname(__file__), 'app', 'db')
-DB_PATH = os.path.join(DB_DIR, 'library.db')
+DB_PATH = str(BRANCH_DATABASE_PATHS[DEFAULT_BRANCH_ID])
 SCHEMA_PATH = os.path.join(DB_DIR, 'schema.sql')
 SEED_PATH = os.path.join(DB_DIR, 'seed.sql')
 
-def init_database():
-    os.makedirs(DB_DIR, exist_ok=True)
-    
-    if os.path.exists(DB_PATH):
-        print(f"Removing existing database at {DB_PATH}")
-        os.remove(DB_PATH)
-    
-    conn = sqlite3.connect(DB_PATH)
+def init_shard(db_path):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    
+
     print("Creating database schema...")
-    
+
     with open(SCHEMA_PATH, 'r') as f:
         schema_sql = f.read()
         cursor.executescript(schema_sql)
-    
+
     print("Seeding database...")
-    
+
     with open(SEED_PATH, 'r') as f:
         seed_sql = f.read()
         cursor.executescript(seed_sql)
-    
+
     conn.commit()
     conn.close()
-    
-    print(f"Database initialized successfully at {DB_PATH}")
-    print("\nSeed data:")
+
+def init_database(branch_ids=None, reset=False):
+    initialized = []
+    for branch_id in branch_ids or BRANCH_IDS:
+        db_path = str(BRANCH_DATABASE_PATHS[branch_id])
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        print(f"\n[{branch_id}]")
+
+        if os.path.exists(db_path):
+            if not reset:
+                print(f"Keeping existing database at {db_path} (use --reset to recreate it)")
+                continue
+            print(f"Removing existing database at {db_path}")
+            os.remove(db_path)
+
+        init_shard(db_path)
+        initialized.append(branch_id)
+
+    if not initialized:
+        print("\nAll branch databases already exist; nothing to initialize")
+        return
+
+    print(f"\nInitialized branches: {', '.join(initialized)}")
+    print(f"Main database: {DB_PATH}")
+    print("\nSeed data per branch:")
     print("- 10 books")
     print("- 6 customers")
     print("- 4 orders")
     print("\nYou can now start the server with: python app/server/main.py")
 
 if __name__ == '__main__':
-    init_database()
+    parser = argparse.ArgumentParser(description="Create and seed the library branch databases")
+    parser.add_argument(
+        "--branch",
+        action="append",
+        choices=BRANCH_IDS,
+        help="Only initialize this branch (repeatable); defaults to every branch in LIBRARY_BRANCHES"
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Delete and reseed existing databases, including chat history in the main database"
+    )
+    args = parser.parse_args()
+
+    init_database(args.branch, args.reset)
@@ -0,0 +1,25 @@
+import sqlite3
+import sys
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DB_DIR = PROJECT_ROOT / "app" / "db"
+sys.path.insert(0, str(PROJECT_ROOT / "app" / "server"))
+
+
+@pytest.fixture
+def library_db(tmp_path, monkeypatch) -> Path:
+    import db
+    from config import DEFAULT_BRANCH_ID
+
+    database_path = tmp_path / "library.db"
+    with closing(sqlite3.connect(str(database_path))) as connection:
+        connection.executescript((DB_DIR / "schema.sql").read_text())
+        connection.executescript((DB_DIR / "seed.sql").read_text())
+        connection.commit()
+    monkeypatch.setitem(db.BRANCH_DATABASE_PATHS, DEFAULT_BRANCH_ID, database_path)
+    return database_path
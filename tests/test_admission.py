@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+import admission
+from admission import AdmissionController, AdmissionRejected
+
+
+def _wait_until(condition, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def _controller(**overrides) -> AdmissionController:
+    settings = {
+        "max_concurrency": 1,
+        "max_queue_size": 10,
+        "queue_slo_seconds": 5.0,
+        "rate_per_second": 1000.0,
+        "burst": 1000.0,
+        "initial_service_seconds": 0.001
+    }
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+def _hold_slot(controller: AdmissionController, session_id: str) -> threading.Event:
+    release = threading.Event()
+    entered = threading.Event()
+
+    def hold() -> None:
+        with controller.admit(session_id):
+            entered.set()
+            release.wait(5)
+
+    threading.Thread(target=hold, daemon=True).start()
+    assert entered.wait(5)
+    return release
+
+
+def test_abandoned_ticket_leaves_queue_consistent() -> None:
+    controller = _controller(queue_slo_seconds=0.05)
+    release = _hold_slot(controller, "busy")
+
+    with pytest.raises(AdmissionRejected) as rejection:
+        with controller.admit("waiting"):
+            pass
+
+    assert rejection.value.status_code == 503
+    metrics = controller.get_metrics()
+    assert metrics["queue_depth"] == 0
+    assert metrics["queued_sessions"] == 0
+    assert metrics["active"] == 1
+
+    release.set()
+    _wait_until(lambda: controller.get_metrics()["active"] == 0)
+    with controller.admit("waiting"):
+        assert controller.get_metrics()["active"] == 1
+    assert controller.get_metrics()["shed"] == 1
+
+
+def test_queued_sessions_are_served_round_robin() -> None:
+    controller = _controller()
+    release = _hold_slot(controller, "busy")
+    order = []
+    threads = []
+
+    def request(session_id: str) -> None:
+        with controller.admit(session_id):
+            order.append(session_id)
+
+    for session_id in ["a", "a", "a", "b"]:
+        thread = threading.Thread(target=request, args=(session_id,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        _wait_until(lambda: controller.get_metrics()["queue_depth"] == len(threads))
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["a", "b", "a", "a"]
+    assert controller.get_metrics()["queue_depth"] == 0
+
+
+def test_rate_limit_returns_429_with_retry_after() -> None:
+    controller = _controller(rate_per_second=0.5, burst=2)
+
+    for _ in range(2):
+        with controller.admit("chatty"):
+            pass
+
+    with pytest.raises(AdmissionRejected) as rejection:
+        with controller.admit("chatty"):
+            pass
+
+    assert rejection.value.status_code == 429
+    assert rejection.value.retry_after_seconds >= 1
+    with controller.admit("quiet"):
+        pass
+
+
+def test_shed_request_does_not_spend_rate_limit_token() -> None:
+    controller = _controller(
+        queue_slo_seconds=1.0,
+        initial_service_seconds=10.0,
+        rate_per_second=0.001,
+        burst=1
+    )
+    release = _hold_slot(controller, "busy")
+
+    with pytest.raises(AdmissionRejected) as rejection:
+        with controller.admit("retrying"):
+            pass
+    assert rejection.value.status_code == 503
+
+    release.set()
+    _wait_until(lambda: controller.get_metrics()["active"] == 0)
+    with controller.admit("retrying"):
+        pass
+    assert controller.get_metrics()["rate_limited"] == 0
+
+
+def test_bucket_eviction_drops_least_recently_used(monkeypatch) -> None:
+    monkeypatch.setattr(admission, "MAX_TRACKED_BUCKETS", 2)
+    controller = _controller(rate_per_second=0.001, burst=1)
+
+    for session_id in ["old", "recent", "new"]:
+        with controller.admit(session_id):
+            pass
+
+    assert list(controller._buckets) == ["recent", "new"]
@@ -0,0 +1,69 @@
+from typing import Dict, List, Optional
+
+import pytest
+
+import agent
+import models
+from agent import AGENT_ERROR_PREFIX, run_tracked_chat_turn
+from models import get_session_messages
+
+
+@pytest.fixture
+def chat_db(library_db, monkeypatch):
+    monkeypatch.setattr(agent, "_session_branches", {})
+    monkeypatch.setattr(models, "ARCHIVE_DATABASE_PATH", library_db.parent / "library_archive.db")
+    return library_db
+
+
+def _fake_agent(response: str, tools: List[str]):
+    def library_agent(
+        user_message: str,
+        session_id: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        branch_id: Optional[str] = None,
+        executed_tools: Optional[List[str]] = None
+    ) -> str:
+        executed_tools.extend(tools)
+        return response
+
+    return library_agent
+
+
+def test_failure_before_any_tool_is_retryable_and_not_saved(chat_db, monkeypatch) -> None:
+    monkeypatch.setattr(agent, "library_agent", _fake_agent(f"{AGENT_ERROR_PREFIX} quota exceeded", []))
+
+    turn = run_tracked_chat_turn("Do you have Clean Code?", "s1")
+
+    assert turn["retryable"] is True
+    assert turn["response"] is None
+    assert get_session_messages("s1") == []
+
+
+def test_failure_after_a_tool_ran_is_final_and_saved(chat_db, monkeypatch) -> None:
+    error = f"{AGENT_ERROR_PREFIX} timeout"
+    monkeypatch.setattr(agent, "library_agent", _fake_agent(error, ["create_order"]))
+
+    turn = run_tracked_chat_turn("Create the order", "s1")
+
+    assert turn["retryable"] is False
+    assert turn["error"] == error
+    assert turn["executed_tools"] == ["create_order"]
+    assert [message["role"] for message in get_session_messages("s1")] == ["user", "assistant"]
+
+
+def test_history_save_failure_does_not_fail_the_turn(chat_db, monkeypatch) -> None:
+    monkeypatch.setattr(agent, "library_agent", _fake_agent("Order 5 created", ["create_order"]))
+
+    def failing_save(session_id: str, role: str, content: str) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(agent, "save_message", failing_save)
+
+    turn = run_tracked_chat_turn("Create the order", "s1")
+
+    assert turn == {
+        "response": "Order 5 created",
+        "error": None,
+        "retryable": False,
+        "executed_tools": ["create_order"]
+    }
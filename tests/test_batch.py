@@ -0,0 +1,183 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+from batch import BatchRunner, load_checkpoint
+
+
+def _write_requests(path: Path, requests: List[Dict]) -> Path:
+    path.write_text("".join(json.dumps(request) + "\n" for request in requests))
+    return path
+
+
+def _read_results(path: Path) -> List[Dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _turn(
+    response: Optional[str] = None,
+    error: Optional[str] = None,
+    retryable: bool = False,
+    executed_tools: Optional[List[str]] = None
+) -> Dict:
+    return {
+        "response": response,
+        "error": error,
+        "retryable": retryable,
+        "executed_tools": executed_tools or []
+    }
+
+
+def _ok_turn(message: str, session_id: str, branch_id: Optional[str]) -> Dict:
+    return _turn(response="ok")
+
+
+@pytest.fixture
+def requests_path(tmp_path) -> Path:
+    return _write_requests(tmp_path / "requests.jsonl", [
+        {"request_id": f"r{index}", "session_id": f"s{index % 3}", "message": f"message {index}"}
+        for index in range(12)
+    ])
+
+
+def test_session_order_is_preserved(tmp_path, requests_path) -> None:
+    seen: Dict[str, List[str]] = {}
+    seen_lock = threading.Lock()
+
+    def chat_turn(message: str, session_id: str, branch_id: Optional[str]) -> Dict:
+        with seen_lock:
+            seen.setdefault(session_id, []).append(message)
+        return _turn(response=f"ok {message}")
+
+    summary = BatchRunner(tmp_path / "out.jsonl", chat_turn, workers=4).run(requests_path)
+
+    assert summary["succeeded"] == 12
+    for session_index in range(3):
+        assert seen[f"s{session_index}"] == [
+            f"message {index}" for index in range(session_index, 12, 3)
+        ]
+
+
+def test_resume_after_torn_final_line(tmp_path, requests_path) -> None:
+    output_path = tmp_path / "out.jsonl"
+    BatchRunner(output_path, _ok_turn, workers=2).run(requests_path)
+
+    content = output_path.read_bytes()
+    lines = content.splitlines(keepends=True)
+    torn_line = json.loads(lines[-1])["line"]
+    output_path.write_bytes(b"".join(lines[:-1]) + lines[-1][:10])
+
+    calls = []
+    summary = BatchRunner(
+        output_path,
+        lambda message, session_id, branch_id: calls.append(message) or _turn(response="ok"),
+        workers=2
+    ).run(requests_path)
+
+    assert summary["skipped"] == 11
+    assert summary["processed"] == 1
+    assert len(calls) == 1
+    results = _read_results(output_path)
+    assert sorted(result["line"] for result in results) == list(range(1, 13))
+    assert [result["line"] for result in results][-1] == torn_line
+
+
+def test_retryable_failure_stops_session_until_resume(tmp_path, requests_path) -> None:
+    output_path = tmp_path / "out.jsonl"
+
+    def flaky_turn(message: str, session_id: str, branch_id: Optional[str]) -> Dict:
+        if session_id == "s1":
+            raise RuntimeError("transient")
+        if session_id == "s2":
+            return _turn(error="Agent Error: quota exceeded", retryable=True)
+        return _turn(response="ok")
+
+    first = BatchRunner(output_path, flaky_turn, workers=2).run(requests_path)
+    assert first["succeeded"] == 4
+    assert first["failed"] == 2
+    assert first["abandoned"] == 6
+
+    second = BatchRunner(output_path, _ok_turn, workers=2).run(requests_path)
+    assert second["skipped"] == 4
+    assert second["succeeded"] == 8
+
+    results = _read_results(output_path)
+    assert len(results) == 12
+    assert all(result["error"] is None for result in results)
+    assert load_checkpoint(output_path) == set(range(1, 13))
+
+
+def test_invalid_requests_are_not_retried(tmp_path) -> None:
+    input_path = tmp_path / "requests.jsonl"
+    input_path.write_text('{"message": "hello"}\nnot json\n{"session_id": "s"}\n')
+    output_path = tmp_path / "out.jsonl"
+
+    BatchRunner(output_path, _ok_turn).run(input_path)
+    summary = BatchRunner(output_path, _ok_turn).run(input_path)
+
+    assert summary["skipped"] == 3
+    assert summary["processed"] == 0
+
+
+def test_failure_after_tool_call_is_final(tmp_path, requests_path) -> None:
+    output_path = tmp_path / "out.jsonl"
+
+    def partial_turn(message: str, session_id: str, branch_id: Optional[str]) -> Dict:
+        if message == "message 0":
+            return _turn(error="Agent Error: timeout", executed_tools=["create_order"])
+        return _turn(response="ok")
+
+    summary = BatchRunner(output_path, partial_turn, workers=2).run(requests_path)
+    assert summary["failed"] == 1
+    assert summary["succeeded"] == 11
+    assert summary["abandoned"] == 0
+
+    calls = []
+    resumed = BatchRunner(
+        output_path,
+        lambda message, session_id, branch_id: calls.append(message) or _turn(response="ok")
+    ).run(requests_path)
+    assert resumed["skipped"] == 12
+    assert calls == []
+    failed = [result for result in _read_results(output_path) if result["error"]]
+    assert failed[0]["executed_tools"] == ["create_order"]
+    assert failed[0]["retryable"] is False
+
+
+def test_rejected_and_malformed_turns_are_final(tmp_path, requests_path) -> None:
+    def bad_turn(message: str, session_id: str, branch_id: Optional[str]) -> Dict:
+        if message == "message 0":
+            raise ValueError("Unknown branch: east")
+        return None if message == "message 1" else _turn(response="ok")
+
+    output_path = tmp_path / "out.jsonl"
+    summary = BatchRunner(output_path, bad_turn, workers=2, max_pending=2).run(requests_path)
+
+    assert summary["failed"] == 2
+    assert summary["succeeded"] == 10
+    assert summary["abandoned"] == 0
+    assert load_checkpoint(output_path) == set(range(1, 13))
+
+
+def test_write_failure_abandons_session_without_hanging(tmp_path, requests_path) -> None:
+    output_path = tmp_path / "out.jsonl"
+    runner = BatchRunner(output_path, _ok_turn, workers=2, max_pending=2)
+    write_result = runner._write_result
+
+    def failing_write(output_file, result: Dict) -> None:
+        if result["session_id"] == "s0":
+            raise OSError("disk full")
+        write_result(output_file, result)
+
+    runner._write_result = failing_write
+    summary = runner.run(requests_path)
+
+    assert summary["succeeded"] == 8
+    assert summary["abandoned"] == 4
+
+    resumed = BatchRunner(output_path, _ok_turn).run(requests_path)
+    assert resumed["skipped"] == 8
+    assert resumed["succeeded"] == 4
@@ -0,0 +1,111 @@
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+import agent
+import db
+import fuzzy_index
+import models
+import sharding
+from agent import SessionBranchError, resolve_session_branch
+from db import use_branch
+from sharding import fan_out
+from tools import create_order, find_books, inventory_summary, restock_book
+
+
+DB_DIR = Path(__file__).resolve().parent.parent / "app" / "db"
+ISBN = "9780132350884"
+
+
+@pytest.fixture
+def north_db(library_db, tmp_path, monkeypatch) -> Path:
+    north_path = tmp_path / "library_north.db"
+    with closing(sqlite3.connect(str(north_path))) as connection:
+        connection.executescript((DB_DIR / "schema.sql").read_text())
+        connection.executescript((DB_DIR / "seed.sql").read_text())
+        connection.execute("UPDATE books SET stock = 2 WHERE isbn = ?", (ISBN,))
+        connection.commit()
+
+    branch_ids = ("main", "north")
+    monkeypatch.setitem(db.BRANCH_DATABASE_PATHS, "north", north_path)
+    monkeypatch.setattr(sharding, "BRANCH_IDS", branch_ids)
+    monkeypatch.setattr(agent, "BRANCH_IDS", branch_ids)
+    monkeypatch.setattr(agent, "_session_branches", {})
+    monkeypatch.setattr(fuzzy_index, "_indexes", {})
+    return north_path
+
+
+def _stock(branch_id: str) -> int:
+    with closing(db.get_connection(branch_id)) as connection:
+        return connection.execute("SELECT stock FROM books WHERE isbn = ?", (ISBN,)).fetchone()[0]
+
+
+def _order_count(branch_id: str) -> int:
+    with closing(db.get_connection(branch_id)) as connection:
+        return connection.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+
+def test_use_branch_routes_writes_to_that_shard(north_db) -> None:
+    main_stock, main_orders, north_orders = _stock("main"), _order_count("main"), _order_count("north")
+
+    with use_branch("north"):
+        create_order.invoke({"customer_id": 1, "items": [{"isbn": ISBN, "qty": 2}]})
+        restock_book.invoke({"isbn": ISBN, "quantity": 5})
+
+    assert _stock("north") == 5
+    assert _order_count("north") == north_orders + 1
+    assert _stock("main") == main_stock
+    assert _order_count("main") == main_orders
+
+    with use_branch("north"), pytest.raises(ValueError):
+        create_order.invoke({"customer_id": 1, "items": [{"isbn": ISBN, "qty": 6}]})
+
+
+def test_all_branches_merges_and_tags_rows(north_db) -> None:
+    books = find_books.invoke({"q": "Clean Code", "by": "title", "all_branches": True})
+    assert sorted((book["branch_id"], book["stock"]) for book in books) == [("main", 12), ("north", 2)]
+
+    typo_books = find_books.invoke({"q": "Clen Cod", "by": "title", "all_branches": True})
+    assert {book["branch_id"] for book in typo_books} == {"main", "north"}
+
+    low_stock = inventory_summary.invoke({"all_branches": True})
+    assert ("north", "Clean Code", 2) in [(row["branch_id"], row["title"], row["stock"]) for row in low_stock]
+    assert all("branch_id" in row for row in low_stock)
+
+    with use_branch("north"):
+        assert [book["stock"] for book in find_books.invoke({"q": "Clean Code", "by": "title"})] == [2]
+
+
+def test_missing_shard_fails_without_creating_a_file(north_db, tmp_path, monkeypatch) -> None:
+    missing_path = tmp_path / "library_south.db"
+    monkeypatch.setitem(db.BRANCH_DATABASE_PATHS, "south", missing_path)
+
+    with pytest.raises(FileNotFoundError):
+        db.get_connection("south")
+    with pytest.raises(RuntimeError, match="south"):
+        fan_out(lambda connection: [], ["main", "north", "south"])
+    assert not missing_path.exists()
+
+
+def test_session_branch_survives_restart(north_db) -> None:
+    assert resolve_session_branch("desk-1", "north") == "north"
+
+    agent._session_branches.clear()
+
+    assert resolve_session_branch("desk-1") == "north"
+    assert resolve_session_branch("desk-2") == "main"
+
+
+def test_stale_session_branch_is_rejected_until_rebound(north_db) -> None:
+    models.save_session_branch("desk-1", "closed")
+
+    with pytest.raises(SessionBranchError, match="closed"):
+        resolve_session_branch("desk-1")
+    with pytest.raises(SessionBranchError):
+        resolve_session_branch("desk-1", "closed")
+
+    assert resolve_session_branch("desk-1", "north") == "north"
+    agent._session_branches.clear()
+    assert resolve_session_branch("desk-1") == "north"
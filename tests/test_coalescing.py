@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from coalescing import SingleFlight
+
+
+def _start(target) -> threading.Thread:
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_concurrent_callers_share_one_execution() -> None:
+    group = SingleFlight("test")
+    entered = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def slow_read() -> int:
+        calls.append(1)
+        entered.set()
+        release.wait(5)
+        return 42
+
+    leader = _start(lambda: results.append(group.do("key", slow_read)))
+    assert entered.wait(5)
+    followers = [_start(lambda: results.append(group.do("key", slow_read))) for _ in range(4)]
+    while group.get_stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert results == [42] * 5
+    assert len(calls) == 1
+    assert group.get_stats()["executions"] == 1
+    assert group.get_stats()["in_flight"] == 0
+
+
+def test_write_during_flight_starts_new_flight() -> None:
+    group = SingleFlight("test")
+    stored = {"stock": 1}
+    entered = threading.Event()
+    release = threading.Event()
+    results = {}
+
+    def stale_read() -> int:
+        value = stored["stock"]
+        entered.set()
+        release.wait(5)
+        return value
+
+    leader = _start(lambda: results.update(before=group.do("stock", stale_read)))
+    assert entered.wait(5)
+
+    stored["stock"] = 2
+    group.invalidate()
+
+    assert group.do("stock", lambda: stored["stock"]) == 2
+    release.set()
+    leader.join(5)
+
+    assert results["before"] == 1
+    assert group.get_stats()["executions"] == 2
+    assert group.get_stats()["coalesced"] == 0
+    assert group.get_stats()["in_flight"] == 0
+
+
+def test_error_is_shared_and_not_cached() -> None:
+    group = SingleFlight("test")
+    entered = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def failing_read() -> int:
+        entered.set()
+        release.wait(5)
+        raise RuntimeError("database is locked")
+
+    def call() -> None:
+        try:
+            group.do("key", failing_read)
+        except RuntimeError as error:
+            errors.append(str(error))
+
+    leader = _start(call)
+    assert entered.wait(5)
+    follower = _start(call)
+    while group.get_stats()["coalesced"] < 1:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert errors == ["database is locked"] * 2
+    assert group.do("key", lambda: 7) == 7
+
+    with pytest.raises(ValueError):
+        group.do("other", lambda: int("x"))
+    assert group.get_stats()["in_flight"] == 0
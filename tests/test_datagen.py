@@ -0,0 +1,50 @@
+import sqlite3
+from contextlib import closing
+
+from datagen import generate_dataset
+
+
+SIZES = {"books": 50, "customers": 20, "order_lines": 300, "messages": 45}
+
+
+def _dump(database_path) -> list:
+    with closing(sqlite3.connect(str(database_path))) as connection:
+        return list(connection.iterdump())
+
+
+def _count(database_path, table: str) -> int:
+    with closing(sqlite3.connect(str(database_path))) as connection:
+        return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_same_seed_produces_identical_dump(tmp_path):
+    first = tmp_path / "first.db"
+    second = tmp_path / "second.db"
+    generate_dataset(first, seed=7, batch_size=16, **SIZES)
+    generate_dataset(second, seed=7, batch_size=64, **SIZES)
+
+    assert _dump(first) == _dump(second)
+
+
+def test_different_seed_produces_different_rows(tmp_path):
+    first = tmp_path / "first.db"
+    second = tmp_path / "second.db"
+    generate_dataset(first, seed=7, **SIZES)
+    generate_dataset(second, seed=8, **SIZES)
+
+    assert _dump(first) != _dump(second)
+
+
+def test_row_counts_match_request(tmp_path):
+    database_path = tmp_path / "load.db"
+    report = generate_dataset(database_path, seed=7, batch_size=16, **SIZES)
+
+    assert _count(database_path, "books") == SIZES["books"]
+    assert _count(database_path, "customers") == SIZES["customers"]
+    assert _count(database_path, "order_items") == SIZES["order_lines"]
+    assert _count(database_path, "messages") == SIZES["messages"]
+    assert _count(database_path, "orders") == report["orders"]["rows"]
+    assert report["total"]["rows"] == sum(
+        report[table]["rows"]
+        for table in ("books", "customers", "orders", "order_items", "messages")
+    )
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import fuzzy_index
+from config import DEFAULT_BRANCH_ID
+from fuzzy_index import TrigramIndex
+
+
+def test_search_tolerates_typos() -> None:
+    index = TrigramIndex()
+    index.add("1", "The Pragmatic Programmer")
+    index.add("2", "Programming Pearls")
+    index.add("3", "Clean Code")
+
+    matches = index.search("Pragmatc Programer")
+
+    assert matches[0][0] == "1"
+    assert all(isbn != "3" for isbn, _ in matches)
+
+
+def test_removed_documents_are_not_returned() -> None:
+    index = TrigramIndex()
+    index.add("1", "Clean Code")
+    index.add("1", "Clean Architecture")
+    index.remove("2")
+
+    assert [isbn for isbn, _ in index.search("Clean Architecture")] == ["1"]
+    index.remove("1")
+    assert index.search("Clean Architecture") == []
+    assert index.get_stats()["documents"] == 0
+
+
+def test_compaction_keeps_scores() -> None:
+    index = TrigramIndex()
+    index.add("1", "The Pragmatic Programmer")
+    index.add("2", "Programming Pearls")
+    before = index.search("Pragmatc Programer")
+
+    for number in range(10):
+        index.add(f"tmp-{number}", f"Temporary Title {number}")
+    for number in range(10):
+        index.remove(f"tmp-{number}")
+
+    assert index.get_stats()["deleted"] == 0
+    assert index.search("Pragmatc Programer") == before
+
+
+def test_search_during_compaction() -> None:
+    index = TrigramIndex()
+    index.add("1", "The Pragmatic Programmer")
+    errors = []
+    stop = threading.Event()
+
+    def churn() -> None:
+        for number in range(2000):
+            index.add(f"tmp-{number}", f"Pragmatic Title {number}")
+            index.remove(f"tmp-{number}")
+        stop.set()
+
+    def search() -> None:
+        try:
+            while not stop.is_set():
+                assert index.search("Pragmatc Programer")[0][0] == "1"
+                index.get_stats()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=churn)] + [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+def test_concurrent_misses_build_once(library_db, monkeypatch) -> None:
+    monkeypatch.setattr(fuzzy_index, "_indexes", {})
+    builds = []
+    build = fuzzy_index._build_fuzzy_indexes_locked
+
+    def slow_build(branch_id: str):
+        builds.append(branch_id)
+        time.sleep(0.05)
+        return build(branch_id)
+
+    monkeypatch.setattr(fuzzy_index, "_build_fuzzy_indexes_locked", slow_build)
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda field=field: results.append(
+                fuzzy_index.get_fuzzy_index(DEFAULT_BRANCH_ID, field).search("Clen Code")
+            )
+        )
+        for field in ("title", "author") * 4
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert builds == [DEFAULT_BRANCH_ID]
+    assert len(results) == 8
+    assert fuzzy_index.get_fuzzy_index(DEFAULT_BRANCH_ID, "title").search("Clen Code")[0][0] == "9780132350884"
@@ -0,0 +1,119 @@
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+import db
+import reservations
+from reservations import (
+    StockContentionError,
+    StockUnavailableError,
+    consume_reservations,
+    release_reservations,
+    reserve_stock,
+    sweep_expired_reservations
+)
+
+
+ISBN = "9780132350884"
+
+
+@pytest.fixture
+def shard(library_db) -> Path:
+    with closing(sqlite3.connect(str(library_db))) as connection:
+        connection.execute("UPDATE books SET stock = 100 WHERE isbn = ?", (ISBN,))
+        connection.commit()
+    return library_db
+
+
+def _stock(shard: Path) -> int:
+    with closing(sqlite3.connect(str(shard))) as connection:
+        return connection.execute("SELECT stock FROM books WHERE isbn = ?", (ISBN,)).fetchone()[0]
+
+
+def _held_quantity(shard: Path) -> int:
+    with closing(sqlite3.connect(str(shard))) as connection:
+        return connection.execute(
+            "SELECT COALESCE(SUM(qty), 0) FROM reservations WHERE status = ?",
+            (reservations.STATUS_HELD,)
+        ).fetchone()[0]
+
+
+def test_concurrent_reservations_never_oversell(shard, monkeypatch) -> None:
+    monkeypatch.setattr(reservations, "STOCK_CAS_BACKOFF_SECONDS", 0.0005)
+    outcomes = {"held": 0, "out_of_stock": 0, "contention": 0}
+    outcomes_lock = threading.Lock()
+
+    def worker() -> None:
+        for _ in range(20):
+            try:
+                reserve_stock(ISBN, 1)
+                outcome = "held"
+            except StockUnavailableError:
+                outcome = "out_of_stock"
+            except StockContentionError:
+                outcome = "contention"
+            with outcomes_lock:
+                outcomes[outcome] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes["held"] == _held_quantity(shard)
+    assert outcomes["held"] + _stock(shard) == 100
+    assert _stock(shard) >= 0
+    assert sum(outcomes.values()) == 160
+
+
+def test_insufficient_stock_is_rejected(shard) -> None:
+    with pytest.raises(StockUnavailableError):
+        reserve_stock(ISBN, 101)
+    assert _stock(shard) == 100
+
+
+def test_release_returns_stock_once(shard) -> None:
+    reservation = reserve_stock(ISBN, 5)
+    assert _stock(shard) == 95
+
+    assert release_reservations([reservation["reservation_id"]]) == 1
+    assert release_reservations([reservation["reservation_id"]]) == 0
+    assert _stock(shard) == 100
+
+
+def test_expired_holds_are_swept_and_cannot_be_consumed(shard) -> None:
+    reservation = reserve_stock(ISBN, 3, ttl_seconds=0)
+    assert _stock(shard) == 97
+
+    with closing(db.get_connection()) as connection:
+        with pytest.raises(StockUnavailableError):
+            consume_reservations(connection, [reservation["reservation_id"]])
+        connection.rollback()
+
+    assert sweep_expired_reservations() == 1
+    assert sweep_expired_reservations() == 0
+    assert _stock(shard) == 100
+
+
+def test_direct_stock_update_invalidates_stale_version(shard) -> None:
+    with closing(db.get_connection()) as connection:
+        stale_version = connection.execute(
+            "SELECT version FROM books WHERE isbn = ?", (ISBN,)
+        ).fetchone()[0]
+
+    db.update_stock(ISBN, 1)
+
+    with closing(db.get_connection()) as connection:
+        cursor = connection.execute(
+            "UPDATE books SET stock = stock - 2, version = version + 1 "
+            "WHERE isbn = ? AND version = ?",
+            (ISBN, stale_version)
+        )
+        assert cursor.rowcount == 0
+    with pytest.raises(StockUnavailableError):
+        reserve_stock(ISBN, 2)
+    assert _stock(shard) == 1
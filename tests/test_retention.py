@@ -0,0 +1,129 @@
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+import db
+import models
+import retention
+from config import PAYLOAD_COMPRESSION_THRESHOLD
+from models import COMPRESSED_PAYLOAD_PREFIX, decode_payload, encode_payload
+
+
+@pytest.fixture
+def archive_db(library_db, tmp_path, monkeypatch) -> Path:
+    archive_path = tmp_path / "library_archive.db"
+    monkeypatch.setattr(models, "ARCHIVE_DATABASE_PATH", archive_path)
+    monkeypatch.setattr(retention, "ARCHIVE_DATABASE_PATH", archive_path)
+    return archive_path
+
+
+def _insert_message(session_id: str, content: str, age_days: int, message_id: int = None) -> None:
+    with closing(db.get_connection()) as connection:
+        connection.execute(
+            "INSERT INTO messages (id, session_id, role, content, created_at) "
+            "VALUES (?, ?, 'user', ?, datetime('now', ?))",
+            (message_id, session_id, content, f"-{age_days} days")
+        )
+        connection.commit()
+
+
+def _insert_tool_call(session_id: str, result: dict, age_days: int) -> None:
+    with closing(db.get_connection()) as connection:
+        connection.execute(
+            "INSERT INTO tool_calls (session_id, name, args_json, result_json, created_at) "
+            "VALUES (?, 'find_books', '{}', ?, datetime('now', ?))",
+            (session_id, encode_payload(json.dumps(result)), f"-{age_days} days")
+        )
+        connection.commit()
+
+
+def _archive(max_age_days: int = 30) -> dict:
+    with closing(db.get_connection()) as connection:
+        return retention.archive_old_sessions(connection, max_age_days)
+
+
+@pytest.mark.parametrize("length", [
+    PAYLOAD_COMPRESSION_THRESHOLD - 1,
+    PAYLOAD_COMPRESSION_THRESHOLD,
+    PAYLOAD_COMPRESSION_THRESHOLD + 1
+])
+def test_payload_round_trip_around_threshold(length: int) -> None:
+    payload = json.dumps({"text": "é" * length})[:length]
+
+    encoded = encode_payload(payload)
+
+    if length < PAYLOAD_COMPRESSION_THRESHOLD:
+        assert encoded == payload
+    else:
+        assert encoded.startswith(COMPRESSED_PAYLOAD_PREFIX)
+    assert decode_payload(encoded) == payload
+
+
+def test_compact_skips_rows_that_are_already_blobs(library_db) -> None:
+    large_payload = json.dumps({"items": ["x" * 50] * 100})
+    with closing(db.get_connection()) as connection:
+        connection.executemany(
+            "INSERT INTO tool_calls (session_id, name, args_json, result_json) VALUES (?, ?, ?, ?)",
+            [
+                ("s", "plain_large", "{}", large_payload),
+                ("s", "already_compressed", "{}", encode_payload(large_payload)),
+                ("s", "small", "{}", "{}")
+            ]
+        )
+        connection.commit()
+
+        assert retention.compact_tool_calls(connection) == 1
+        assert retention.compact_tool_calls(connection) == 0
+
+        rows = connection.execute("SELECT name, result_json FROM tool_calls ORDER BY id").fetchall()
+    assert [type(row['result_json']) for row in rows] == [bytes, bytes, str]
+    assert all(decode_payload(row['result_json']) in (large_payload, "{}") for row in rows)
+
+
+def test_archive_moves_only_sessions_past_cutoff(archive_db) -> None:
+    _insert_message("old", "hi", age_days=40)
+    _insert_tool_call("old", {"count": 1}, age_days=40)
+    _insert_message("mixed", "early", age_days=40)
+    _insert_tool_call("mixed", {"count": 2}, age_days=1)
+    _insert_message("new", "hello", age_days=1)
+    models.save_session_branch("old", "main")
+    models.save_session_branch("new", "main")
+
+    archived = _archive()
+
+    assert archived == {"sessions": 1, "messages": 1, "tool_calls": 1}
+    with closing(db.get_connection()) as connection:
+        assert {row[0] for row in connection.execute("SELECT session_id FROM messages")} == {"mixed", "new"}
+        assert {row[0] for row in connection.execute("SELECT session_id FROM session_branches")} == {"new"}
+    with closing(models.get_archive_connection()) as connection:
+        assert [row[0] for row in connection.execute("SELECT session_id FROM messages")] == ["old"]
+
+
+def test_archive_keeps_history_when_ids_are_reused(archive_db) -> None:
+    _insert_message("old", "hi", age_days=40, message_id=1)
+    _archive()
+    _insert_message("other", "second life", age_days=40, message_id=1)
+    _archive()
+
+    with closing(sqlite3.connect(str(archive_db))) as connection:
+        rows = connection.execute(
+            "SELECT source_id, session_id, content FROM messages ORDER BY id"
+        ).fetchall()
+    assert rows == [(1, "old", "hi"), (1, "other", "second life")]
+
+
+def test_archived_sessions_remain_readable(archive_db) -> None:
+    _insert_message("old", "hi", age_days=40)
+    _insert_tool_call("old", {"items": ["y" * 2000]}, age_days=40)
+    models.save_session_branch("old", "main")
+    _archive()
+
+    models.save_message("old", "user", "back again")
+
+    assert [message['content'] for message in models.get_session_messages("old")] == ["hi", "back again"]
+    assert "old" in models.get_sessions()
+    assert json.loads(models.get_tool_calls("old")[0]['result_json']) == {"items": ["y" * 2000]}
+    assert models.get_session_branch("old") == "main"